@@ -1,9 +1,16 @@
 import csv
 import json
+import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.taxonomy import CompiledTaxonomy, source_digest, write_artifact
 
 INPUT_FILE = "resource_taxonomy_table" # Adjust path if needed
 OUTPUT_FILE = "resource_taxonomy.json"
+ARTIFACT_FILE = "resource_taxonomy.bin" # Precompiled form loaded by the services (see core/taxonomy.py)
 
 # --------------------------------------------------------------------------
 # CONFIGURATION
@@ -131,9 +138,14 @@ def main():
 
 	sort_tree(forest)
 
-	with open(OUTPUT_FILE, 'w') as f:
-		json.dump(forest, f, indent=4)
+	raw = json.dumps(forest, indent=4).encode('utf-8')
+	with open(OUTPUT_FILE, 'wb') as f:
+		f.write(raw)
 	print(f"Saved {OUTPUT_FILE} - Single Source of Truth")
 
+	# 5. Precompiled artifact, stamped with the hash of the JSON it came from
+	write_artifact(CompiledTaxonomy.from_tree(forest, source_digest(raw)), ARTIFACT_FILE)
+	print(f"Saved {ARTIFACT_FILE}")
+
 if __name__ == "__main__":
 	main()
\ No newline at end of file
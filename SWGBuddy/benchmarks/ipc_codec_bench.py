@@ -0,0 +1,103 @@
+"""
+IPC Codec Benchmark
+
+Compares the current behaviour (multiprocessing.Queue pickling nested dicts) with the
+framed codecs from core.codec, for the three message shapes that cross our queues.
+
+Two measurements per codec / message type:
+  - codec:  encode + decode in-process (throughput and CPU us per message)
+  - queue:  end-to-end through a real multiprocessing.Queue to a consumer process
+
+Usage (from the SWGBuddy directory):
+	python -m benchmarks.ipc_codec_bench [--count 50000]
+
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import codec
+from core.codec import FramedQueue, MSG_LOG, MSG_COMMAND, MSG_REPLY
+
+SAMPLES = {
+	MSG_LOG: {"level": "INFO", "source": "validation-0", "msg": "User Krayt added resource: Ibasan (Corellian Wild Milk)"},
+	MSG_COMMAND: {
+		"id": "5f0c7e0a-8d8e-4c55-9d4e-0d1f0c6a9b11",
+		"action": "add_resource",
+		"payload": {
+			"name": "Ibasan", "type": "Corellian Wild Milk", "planet": ["Corellia"], "notes": "",
+			"res_dr": 512, "res_oq": 877, "res_fl": 642, "res_pe": 301, "server_id": "cuemu"
+		},
+		"server_id": "cuemu",
+		"user_context": {"id": "112233445566778899", "username": "Krayt", "avatar": "a1b2c3d4e5f6"}
+	},
+	MSG_REPLY: {"id": "5f0c7e0a-8d8e-4c55-9d4e-0d1f0c6a9b11", "status": "success", "error": None},
+}
+NAMES = {MSG_LOG: "log", MSG_COMMAND: "command", MSG_REPLY: "reply"}
+
+
+def _consume(queue, count):
+	for _ in range(count):
+		queue.get()
+
+
+def bench_codec(msg_type, codec_name, count):
+	obj = SAMPLES[msg_type]
+	if codec_name == "baseline":
+		import pickle
+		dumps = lambda o: pickle.dumps(o)  # what multiprocessing.Queue does today
+		loads = pickle.loads
+	else:
+		selected = codec.get_codec(codec_name)
+		dumps = lambda o: codec.encode(msg_type, o, selected)
+		loads = codec.decode
+
+	start, cpu = time.perf_counter(), time.process_time()
+	for _ in range(count):
+		loads(dumps(obj))
+	wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+	return count / wall, cpu / count * 1e6, len(dumps(obj))
+
+
+def bench_queue(msg_type, codec_name, count):
+	raw = multiprocessing.Queue()
+	queue = raw if codec_name == "baseline" else FramedQueue(raw, msg_type, codec_name)
+	obj = SAMPLES[msg_type]
+
+	consumer = multiprocessing.Process(target=_consume, args=(queue, count))
+	consumer.start()
+	start, cpu = time.perf_counter(), time.process_time()
+	for _ in range(count):
+		queue.put(obj)
+	consumer.join()
+	wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+	# process_time only covers the producer (incl. its feeder thread)
+	return count / wall, cpu / count * 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--count", type=int, default=50000)
+	args = parser.parse_args()
+
+	# "baseline" is SWG_IPC_CODEC=native
+	codecs = ["baseline", "pickle"] + (["msgpack"] if codec.msgpack else [])
+	if not codec.msgpack:
+		print("msgpack not installed: skipping the msgpack codec.\n")
+
+	print(f"{'message':<9}{'codec':<10}{'bytes':>7}{'codec msg/s':>14}{'codec cpu us':>14}{'queue msg/s':>14}{'queue cpu us':>14}")
+	for msg_type in (MSG_LOG, MSG_COMMAND, MSG_REPLY):
+		for name in codecs:
+			c_rate, c_cpu, size = bench_codec(msg_type, name, args.count)
+			q_rate, q_cpu = bench_queue(msg_type, name, args.count)
+			label = name if msg_type != MSG_LOG or name == "baseline" else f"{name}*"
+			print(f"{NAMES[msg_type]:<9}{label:<10}{size:>7}{c_rate:>14,.0f}{c_cpu:>14.2f}{q_rate:>14,.0f}{q_cpu:>14.2f}")
+	print("\n* log frames always use the struct-packed LogCodec, whatever SWG_IPC_CODEC says.")
+
+
+if __name__ == "__main__":
+	main()
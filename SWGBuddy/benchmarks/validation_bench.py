@@ -0,0 +1,147 @@
+"""
+Validation Micro-Benchmark
+
+Validations (+ ratings) per second for the compiled core.taxonomy.ResourceValidator
+against the previous dict-of-dict implementation, reproduced below as LegacyRules.
+
+Usage (from the SWGBuddy directory):
+	python -m benchmarks.validation_bench [--count 200000]
+
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.taxonomy import STAT_COLS, compile_validators, iter_nodes, load_tree, taxonomy_path
+
+
+class LegacyRules:
+	"""ValidationService._validate_resource / _calculate_ratings before compilation."""
+
+	def __init__(self, tree):
+		self.valid_resources = {}
+		for node in iter_nodes(tree):
+			if node.get('is_valid'):
+				self.valid_resources[node['label']] = {
+					"id": node['id'],
+					"stats": node.get('stats', {}),
+					"planets": node.get('planets', [])
+				}
+
+	def _get_rules(self, data):
+		rules = self.valid_resources.get(data.get('type'))
+		if not rules:
+			raise ValueError("invalid type")
+		return rules
+
+	def validate(self, data):
+		self._validate_resource(data)
+		self._calculate_ratings(data)
+
+	def _validate_resource(self, data):
+		rules = self._get_rules(data)
+		stats_def = rules.get('stats', {})
+		allowed_planets = rules.get('planets', [])
+
+		name = data.get('name', '')
+		if not name:
+			raise ValueError("Resource name is required.")
+		if not re.match(r'^[a-zA-Z0-9\s\-\(\)\.]+$', name):
+			raise ValueError("Invalid characters in Resource Name.")
+		if len(name) > 100:
+			raise ValueError("Name too long.")
+
+		notes = data.get('notes', '')
+		if notes:
+			data['notes'] = re.sub(r'<[^>]*>', '', notes)
+
+		planet_input = data.get('planet')
+		if planet_input:
+			planet_str = str(planet_input).capitalize()
+			data['planet'] = planet_str
+			if planet_str not in allowed_planets:
+				raise ValueError("bad planet")
+
+		for stat in STAT_COLS:
+			val = data.get(stat)
+			if val is None or val == "": continue
+			val = int(val)
+			if stat not in stats_def:
+				if val > 0: raise ValueError(f"{stat} is not applicable for this resource.")
+				continue
+			mn = stats_def[stat]['min']
+			mx = stats_def[stat]['max']
+			if not (mn <= val <= mx):
+				raise ValueError("out of range")
+
+	def _calculate_ratings(self, data):
+		rules = self._get_rules(data)
+		stats_def = rules.get('stats', {})
+		valid_ratings = []
+		for stat in STAT_COLS:
+			val = data.get(stat)
+			if val is None or val == "" or str(val) == "0": continue
+			val = int(val)
+			stat_max = stats_def[stat]['max']
+			rating = round(val / stat_max, 3) if stat_max > 0 else 0.0
+			data[f"{stat}_rating"] = rating
+			valid_ratings.append(rating)
+		if valid_ratings:
+			data['res_weight_rating'] = round(sum(valid_ratings) / len(valid_ratings), 3)
+		else:
+			data['res_weight_rating'] = 0.0
+
+
+def make_packets(validators, count, seed=7):
+	"""Valid add_resource payloads with stats inside each type's bounds (as strings, like the web form)."""
+	rng = random.Random(seed)
+	types = sorted(validators.values(), key=lambda v: v.label)
+	packets = []
+	for i in range(count):
+		v = rng.choice(types)
+		data = {"name": f"Spawn{i}", "type": v.label, "planet": rng.choice(v.planet_list), "notes": "seen near <b>Coronet</b>"}
+		for idx in v.stat_index:
+			mn, mx = v.bounds[idx]
+			data[STAT_COLS[idx]] = str(rng.randint(mn, mx))
+		packets.append(data)
+	return packets
+
+
+def run(label, validate, packets):
+	batch = [dict(p) for p in packets]
+	start = time.perf_counter()
+	for data in batch:
+		validate(data)
+	elapsed = time.perf_counter() - start
+	rate = len(batch) / elapsed
+	print(f"{label:<10}{rate:>14,.0f} validations/s{elapsed / len(batch) * 1e6:>10.2f} us each")
+	return rate, batch
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--count", type=int, default=200000)
+	args = parser.parse_args()
+
+	tree = load_tree(taxonomy_path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+	legacy = LegacyRules(tree)
+	validators = compile_validators(tree)
+	packets = make_packets(validators, args.count)
+
+	before, legacy_out = run("legacy", legacy.validate, packets)
+	after, compiled_out = run("compiled", lambda d: validators[d['type']].validate(d), packets)
+
+	mismatches = sum(
+		1 for a, b in zip(legacy_out, compiled_out)
+		if any(a.get(k) != b.get(k) for k in list(a) + list(b) if k.endswith("rating"))
+	)
+	print(f"\nspeedup: {after / before:.2f}x   rating mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,164 @@
+"""
+SWGBuddy Codec Module
+
+Pluggable serializers for the IPC queues (validation, reply and log).
+
+Every frame starts with a 2 byte header: the message type tag and the codec id that
+produced the body. Log records (by far the most frequent message) always use a fixed
+struct-packed layout; commands and replies use the codec selected by SWG_IPC_CODEC
+("pickle" or "msgpack"). Because the codec id travels with each frame, a reader can
+decode frames from either codec.
+
+SWG_IPC_CODEC defaults to "native": plain multiprocessing.Queue pickling, no framing.
+benchmarks/ipc_codec_bench.py showed the per-message cost is dominated by the queue's
+pipe write and locking rather than by serialization, so framing is opt-in until a
+profile says otherwise.
+
+"""
+import os
+import pickle
+import struct
+import multiprocessing
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
+# Message type tags
+MSG_LOG = 1
+MSG_COMMAND = 2
+MSG_REPLY = 3
+
+# Codec ids
+CODEC_STRUCT = 0
+CODEC_PICKLE = 1
+CODEC_MSGPACK = 2
+
+# Frame header: message type tag, codec id
+HEADER = struct.Struct("!BB")
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+_LOG_LEVEL_INDEX = {name: i for i, name in enumerate(LOG_LEVELS)}
+# level index, source length
+_LOG_HEADER = struct.Struct("!BH")
+
+
+class PickleCodec:
+	codec_id = CODEC_PICKLE
+
+	def dumps(self, obj):
+		return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+	def loads(self, data):
+		return pickle.loads(data)
+
+
+class MsgpackCodec:
+	codec_id = CODEC_MSGPACK
+
+	def dumps(self, obj):
+		return msgpack.packb(obj, use_bin_type=True, default=str)
+
+	def loads(self, data):
+		return msgpack.unpackb(data, raw=False)
+
+
+class LogCodec:
+	"""Fixed layout for {"level", "source", "msg"} log records."""
+	codec_id = CODEC_STRUCT
+
+	def dumps(self, record):
+		source = str(record.get("source", "System")).encode("utf-8")
+		level = _LOG_LEVEL_INDEX.get(record.get("level", "INFO"), 1)
+		return b"".join((_LOG_HEADER.pack(level, len(source)), source, str(record.get("msg", "")).encode("utf-8")))
+
+	def loads(self, data):
+		data = bytes(data)
+		level, source_len = _LOG_HEADER.unpack_from(data)
+		start = _LOG_HEADER.size
+		return {
+			"level": LOG_LEVELS[level],
+			"source": data[start:start + source_len].decode("utf-8"),
+			"msg": data[start + source_len:].decode("utf-8")
+		}
+
+
+_LOG_CODEC = LogCodec()
+_CODECS = {CODEC_STRUCT: _LOG_CODEC, CODEC_PICKLE: PickleCodec()}
+if msgpack:
+	_CODECS[CODEC_MSGPACK] = MsgpackCodec()
+
+
+def codec_name():
+	return os.getenv("SWG_IPC_CODEC", "native").lower()
+
+
+def get_codec(name=None):
+	"""Resolves a codec by name (default: SWG_IPC_CODEC). Falls back to pickle if msgpack is missing."""
+	name = (name or codec_name()).lower()
+	if name == "msgpack" and msgpack:
+		return _CODECS[CODEC_MSGPACK]
+	return _CODECS[CODEC_PICKLE]
+
+
+def encode(msg_type, obj, codec=None):
+	codec = _LOG_CODEC if msg_type == MSG_LOG else (codec or get_codec())
+	return bytes((msg_type, codec.codec_id)) + codec.dumps(obj)
+
+
+def decode(frame):
+	"""Returns (msg_type, obj)."""
+	msg_type, codec_id = HEADER.unpack_from(frame)
+	codec = _CODECS.get(codec_id)
+	if codec is None:
+		raise ValueError(f"Unknown IPC codec id {codec_id} (is msgpack installed?)")
+	return msg_type, codec.loads(memoryview(frame)[HEADER.size:])
+
+
+class FramedQueue:
+	"""
+	multiprocessing.Queue wrapper that only ever puts bytes on the pipe.
+
+	Pickling a bytes object is a plain copy, so the queue's feeder thread no longer walks
+	nested dicts; the (cheaper) codec does the work instead. None is passed through
+	untouched so the shutdown sentinels keep working.
+	"""
+
+	def __init__(self, queue, msg_type, codec_name=None):
+		self.queue = queue
+		self.msg_type = msg_type
+		self.codec = _LOG_CODEC if msg_type == MSG_LOG else get_codec(codec_name)
+		self._header = bytes((msg_type, self.codec.codec_id))
+
+	def _encode(self, obj):
+		return None if obj is None else self._header + self.codec.dumps(obj)
+
+	def _decode(self, frame):
+		return None if frame is None else decode(frame)[1]
+
+	def put(self, obj, block=True, timeout=None):
+		self.queue.put(self._encode(obj), block, timeout)
+
+	def put_nowait(self, obj):
+		self.queue.put_nowait(self._encode(obj))
+
+	def get(self, block=True, timeout=None):
+		return self._decode(self.queue.get(block, timeout))
+
+	def get_nowait(self):
+		return self._decode(self.queue.get_nowait())
+
+	def qsize(self):
+		return self.queue.qsize()
+
+	def empty(self):
+		return self.queue.empty()
+
+
+def make_queue(msg_type, maxsize=0):
+	"""Creates an IPC queue for msg_type, framed unless SWG_IPC_CODEC is "native"."""
+	queue = multiprocessing.Queue(maxsize)
+	if codec_name() == "native":
+		return queue
+	return FramedQueue(queue, msg_type)
@@ -71,7 +71,8 @@ class Core(Serializable):
         
         if self.log_queue:
             try:
-                self.log_queue.put({
+                # Never block the caller on a full (bounded) log queue; fall back to stderr
+                self.log_queue.put_nowait({
                     "level": level,
                     "source": self.mod,
                     "msg": msg_str
@@ -6,6 +6,7 @@ Provides a thread-safe Database Context for services to access PostgreSQL direct
 """
 import os
 import sys
+import uuid
 import psycopg2
 import logging
 from psycopg2 import pool
@@ -20,6 +21,34 @@ class DatabaseContext:
 	_pool = None
 	_pool_pid = None  # Track which process created the pool
 
+	@staticmethod
+	def _connect_kwargs():
+		return dict(
+			# mTLS Configuration
+			host=os.getenv("SWG_DB_HOST", "127.0.0.1"),
+			database=os.getenv("SWG_DB_NAME", "swgbuddy"),
+			user=os.getenv("SWG_DB_USER", "swgbuddy_service"),
+			password=None, # Unused due to mTLS authentication
+			
+			# SSL strict mode and cert paths
+			sslmode="verify-full",
+			sslrootcert=os.getenv("SWG_SSL_ROOT_CERT"),
+			sslcert=os.getenv("SWG_SSL_CLIENT_CERT"),
+			sslkey=os.getenv("SWG_SSL_CLIENT_KEY"),
+			
+			cursor_factory=RealDictCursor
+		)
+
+	@classmethod
+	def dedicated_connection(cls, autocommit=False):
+		"""
+		Opens a connection outside the pool, for long-lived consumers (e.g. LISTEN)
+		that must not hold a pooled connection hostage. Caller is responsible for closing it.
+		"""
+		conn = psycopg2.connect(**cls._connect_kwargs())
+		conn.autocommit = autocommit
+		return conn
+
 	@classmethod
 	def initialize(cls):
 		"""
@@ -35,19 +64,7 @@ class DatabaseContext:
 				cls._pool = psycopg2.pool.ThreadedConnectionPool(
 					minconn=1, 
 					maxconn=20, # Allow up to 20 concurrent connections per service
-					# mTLS Configuration
-					host=os.getenv("SWG_DB_HOST", "127.0.0.1"),
-					database=os.getenv("SWG_DB_NAME", "swgbuddy"),
-					user=os.getenv("SWG_DB_USER", "swgbuddy_service"),
-					password=None, # Unused due to mTLS authentication
-					
-					# SSL strict mode and cert paths
-					sslmode="verify-full",
-					sslrootcert=os.getenv("SWG_SSL_ROOT_CERT"),
-					sslcert=os.getenv("SWG_SSL_CLIENT_CERT"),
-					sslkey=os.getenv("SWG_SSL_CLIENT_KEY"),
-					
-					cursor_factory=RealDictCursor
+					**cls._connect_kwargs()
 				)
 				cls._pool_pid = os.getpid()
 				logging.info(f"[Database] Pool initialized for PID: {cls._pool_pid}")
@@ -120,6 +137,28 @@ class DatabaseContext:
 			if conn:
 				cls.return_connection(conn)
 
+	@classmethod
+	@contextmanager
+	def server_cursor(cls, itersize=2000):
+		"""
+		Named (server-side) cursor for large reads: iterating it fetches itersize rows per
+		round-trip instead of materializing the whole result. Read-only; the transaction is
+		rolled back on exit.
+		"""
+		conn = None
+		try:
+			conn = cls.get_connection()
+			with conn.cursor(name=f"swg_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+				cur.itersize = itersize
+				yield cur
+		except Exception as e:
+			logging.error(f"[Database] Query Error: {e}")
+			raise e
+		finally:
+			if conn:
+				conn.rollback()
+				cls.return_connection(conn)
+
 	@classmethod
 	def close(cls):
 		"""Closes all connections in the pool."""
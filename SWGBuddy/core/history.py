@@ -0,0 +1,219 @@
+"""
+SWGBuddy History Module
+
+Per-class spawn history for GET /api/history: how often a class spawned, when it was
+first and last seen, and each stat's distribution and best-ever spawn.
+
+The archive (retired_resources) only grows, so nothing here scans it per request.
+Retiring a spawn folds it into three small aggregate tables in the same transaction:
+
+	resource_history          (server, class): spawns, first_seen, last_seen
+	resource_history_stats    (server, class, stat): n, sum, sum of squares, min, max, best
+	resource_history_buckets  (server, class, stat, bucket): fixed-width histogram counts
+
+A taxonomy node's history is the sum over the classes in its subtree, a handful of rows.
+A worker builds the aggregates of any server in its shard that has retired spawns but no
+history yet when it starts, so spawns retired before these tables existed are counted
+without a manual step. A full rebuild is
+	python -m core.history [--server cuemu]
+(from the SWGBuddy directory).
+
+"""
+import argparse
+import math
+
+from psycopg2.extras import execute_values
+
+from core.database import DatabaseContext
+from core.taxonomy import STAT_COLS
+
+# Stats run 1..1000: 20 buckets of 50
+BUCKET_WIDTH = 50
+BUCKETS = 20
+
+
+def bucket_of(value):
+	return min(int(value) // BUCKET_WIDTH, BUCKETS - 1)
+
+
+def record_retirements(cur, server_id, rows):
+	"""Folds retired spawn rows (as copied into retired_resources) into the aggregates."""
+	if not rows:
+		return
+
+	# Pre-aggregated per key: one statement may not update the same row twice
+	classes, stats, buckets = {}, {}, {}
+	for row in rows:
+		class_id = row['resource_class_id']
+		count, first_seen = classes.get(class_id, (0, None))
+		reported = row.get('date_reported')
+		classes[class_id] = (count + 1, reported if first_seen is None else min(first_seen, reported or first_seen))
+		for stat in STAT_COLS:
+			value = row.get(stat)
+			if not value:
+				continue
+			s = stats.get((class_id, stat))
+			if s is None:
+				stats[(class_id, stat)] = [1, value, value * value, value, value, row['id'], row['name']]
+			else:
+				s[0] += 1
+				s[1] += value
+				s[2] += value * value
+				s[3] = min(s[3], value)
+				if value > s[4]:
+					s[4:7] = [value, row['id'], row['name']]
+			key = (class_id, stat, bucket_of(value))
+			buckets[key] = buckets.get(key, 0) + 1
+
+	execute_values(cur, """
+		INSERT INTO resource_history AS h (server_id, class_id, spawns, first_seen, last_seen)
+		VALUES %s
+		ON CONFLICT (server_id, class_id) DO UPDATE SET
+			spawns = h.spawns + EXCLUDED.spawns,
+			first_seen = LEAST(h.first_seen, EXCLUDED.first_seen),
+			last_seen = GREATEST(h.last_seen, EXCLUDED.last_seen)
+	""", [(server_id, c, n, first) for c, (n, first) in classes.items()], template="(%s, %s, %s, %s, now())")
+	if not stats:
+		return
+
+	execute_values(cur, """
+		INSERT INTO resource_history_stats AS s
+			(server_id, class_id, stat, n, total, total_sq, min_value, max_value, best_spawn_id, best_name)
+		VALUES %s
+		ON CONFLICT (server_id, class_id, stat) DO UPDATE SET
+			n = s.n + EXCLUDED.n,
+			total = s.total + EXCLUDED.total,
+			total_sq = s.total_sq + EXCLUDED.total_sq,
+			min_value = LEAST(s.min_value, EXCLUDED.min_value),
+			max_value = GREATEST(s.max_value, EXCLUDED.max_value),
+			best_spawn_id = CASE WHEN EXCLUDED.max_value > s.max_value THEN EXCLUDED.best_spawn_id ELSE s.best_spawn_id END,
+			best_name = CASE WHEN EXCLUDED.max_value > s.max_value THEN EXCLUDED.best_name ELSE s.best_name END
+	""", [(server_id, c, stat, *values) for (c, stat), values in stats.items()])
+
+	execute_values(cur, """
+		INSERT INTO resource_history_buckets AS b (server_id, class_id, stat, bucket, n)
+		VALUES %s
+		ON CONFLICT (server_id, class_id, stat, bucket) DO UPDATE SET n = b.n + EXCLUDED.n
+	""", [(server_id, c, stat, b, n) for (c, stat, b), n in buckets.items()])
+
+
+def rebuild(cur, server_id=None):
+	"""Recomputes the aggregates from retired_resources (one server or all). Returns spawns counted."""
+	where = "WHERE r.server_id = %s" if server_id else ""
+	params = (server_id,) if server_id else ()
+	for table in ("resource_history", "resource_history_stats", "resource_history_buckets"):
+		cur.execute(f"DELETE FROM {table} {'WHERE server_id = %s' if server_id else ''}", params)
+
+	cur.execute(f"""
+		INSERT INTO resource_history (server_id, class_id, spawns, first_seen, last_seen)
+		SELECT r.server_id, r.resource_class_id, count(*), min(r.date_reported),
+			   max(COALESCE(t.retired_at, r.last_modified, r.date_reported))
+		FROM retired_resources r
+		LEFT JOIN resource_tombstones t ON t.server_id = r.server_id AND t.spawn_id = r.id
+		{where}
+		GROUP BY r.server_id, r.resource_class_id
+	""", params)
+	for stat in STAT_COLS:
+		cur.execute(f"""
+			INSERT INTO resource_history_stats
+				(server_id, class_id, stat, n, total, total_sq, min_value, max_value, best_spawn_id, best_name)
+			SELECT server_id, resource_class_id, %s, count(*), sum({stat}), sum({stat}::float8 * {stat}),
+				   min({stat}), max({stat}),
+				   (array_agg(id ORDER BY {stat} DESC, id))[1], (array_agg(name ORDER BY {stat} DESC, id))[1]
+			FROM retired_resources r {where} {'AND' if where else 'WHERE'} {stat} > 0
+			GROUP BY server_id, resource_class_id
+		""", (stat,) + params)
+		cur.execute(f"""
+			INSERT INTO resource_history_buckets (server_id, class_id, stat, bucket, n)
+			SELECT server_id, resource_class_id, %s, LEAST(floor({stat} / %s)::int, %s), count(*)
+			FROM retired_resources r {where} {'AND' if where else 'WHERE'} {stat} > 0
+			GROUP BY 1, 2, 3, 4
+		""", (stat, BUCKET_WIDTH, BUCKETS - 1) + params)
+
+	cur.execute(f"SELECT COALESCE(sum(spawns), 0) AS n FROM resource_history {'WHERE server_id = %s' if server_id else ''}", params)
+	return int(cur.fetchone()['n'])
+
+
+def percentile(histogram, value):
+	"""Share (0-100) of historical spawns below value, interpolated within its bucket."""
+	total = sum(histogram)
+	if not total:
+		return None
+	b = bucket_of(value)
+	within = (min(value, BUCKETS * BUCKET_WIDTH) - b * BUCKET_WIDTH) / BUCKET_WIDTH
+	return round(100.0 * (sum(histogram[:b]) + histogram[b] * within) / total, 1)
+
+
+def class_history(cur, server_id, ranges, values=None):
+	"""
+	History of the classes in ranges (a taxonomy node's class-id intervals). values maps
+	stat -> a spawn's value, to place it in each distribution ("was this one good?").
+	"""
+	in_node = " OR ".join(["class_id BETWEEN %s AND %s"] * len(ranges))
+	params = [server_id] + [bound for pair in ranges for bound in pair]
+
+	cur.execute(f"""
+		SELECT COALESCE(sum(spawns), 0) AS spawns, min(first_seen) AS first_seen, max(last_seen) AS last_seen,
+			   EXTRACT(EPOCH FROM max(last_seen)) AS last_seen_ts
+		FROM resource_history WHERE server_id = %s AND ({in_node})
+	""", params)
+	summary = dict(cur.fetchone())
+
+	cur.execute(f"""
+		SELECT count(*) AS active, EXTRACT(EPOCH FROM max(date_reported)) AS newest_ts FROM resource_spawns
+		WHERE server_id = %s AND ({in_node.replace('class_id', 'resource_class_id')})
+	""", params)
+	summary.update(cur.fetchone())
+
+	cur.execute(f"""
+		SELECT stat, n, total, total_sq, min_value, max_value, best_spawn_id, best_name
+		FROM resource_history_stats WHERE server_id = %s AND ({in_node})
+	""", params)
+	stats = {}
+	for row in cur.fetchall():
+		s = stats.setdefault(row['stat'], {"n": 0, "total": 0.0, "total_sq": 0.0, "min": None, "max": None, "best": None})
+		s['n'] += row['n']
+		s['total'] += row['total']
+		s['total_sq'] += row['total_sq']
+		s['min'] = row['min_value'] if s['min'] is None else min(s['min'], row['min_value'])
+		if s['max'] is None or row['max_value'] > s['max']:
+			s['max'] = row['max_value']
+			s['best'] = {"id": row['best_spawn_id'], "name": row['best_name'], "value": row['max_value']}
+
+	cur.execute(f"""
+		SELECT stat, bucket, sum(n) AS n FROM resource_history_buckets
+		WHERE server_id = %s AND ({in_node}) GROUP BY stat, bucket
+	""", params)
+	histograms = {}
+	for row in cur.fetchall():
+		histograms.setdefault(row['stat'], [0] * BUCKETS)[row['bucket']] = int(row['n'])
+
+	for stat, s in stats.items():
+		n, total, total_sq = s.pop('n'), s.pop('total'), s.pop('total_sq')
+		s['count'] = n
+		s['mean'] = round(total / n, 1) if n else None
+		s['stddev'] = round(math.sqrt(max(total_sq / n - (total / n) ** 2, 0.0)), 1) if n else None
+		s['histogram'] = histograms.get(stat, [0] * BUCKETS)
+		if values and values.get(stat) is not None:
+			s['percentile'] = percentile(s['histogram'], values[stat])
+
+	summary['bucket_width'] = BUCKET_WIDTH
+	summary['stats'] = stats
+	return summary
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--server", help="Only rebuild this server_id (default: all servers)")
+	args = parser.parse_args()
+
+	DatabaseContext.initialize()
+	try:
+		with DatabaseContext.cursor(commit=True) as cur:
+			print(f"History rebuilt from {rebuild(cur, args.server):,} retired spawns")
+	finally:
+		DatabaseContext.close_all()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,108 @@
+"""
+SWGBuddy Importer Module
+
+Parses bulk spawn uploads (CSV or JSON) into add_resource style payloads.
+
+The web process reads the upload a chunk of IMPORT_CHUNK rows at a time and hands each
+chunk to the Validation worker, which validates and inserts it in one transaction. CSV
+is parsed as it is read; a JSON document is parsed whole (json has no incremental
+reader) and then chunked the same way.
+Column headers are forgiving, so spreadsheet exports work as is: "OQ", "oq" and
+"res_oq" are all accepted, as are "resource type"/"class" for the type and "planets"
+for the planet.
+
+"""
+import csv
+import io
+import json
+import os
+
+from core.taxonomy import STAT_COLS
+
+# Rows per import_resources packet
+IMPORT_CHUNK = int(os.getenv("SWG_IMPORT_CHUNK", "250"))
+
+# Largest accepted upload, in rows
+IMPORT_MAX_ROWS = int(os.getenv("SWG_IMPORT_MAX_ROWS", "5000"))
+
+_ALIASES = {
+	"name": "name",
+	"resource": "name",
+	"resource name": "name",
+	"type": "type",
+	"resource type": "type",
+	"class": "type",
+	"planet": "planet",
+	"planets": "planet",
+	"notes": "notes",
+	"note": "notes",
+}
+for _stat in STAT_COLS:
+	_ALIASES[_stat] = _stat
+	_ALIASES[_stat[4:]] = _stat
+
+
+def _normalize(raw):
+	"""Maps a raw row onto payload keys. Unknown columns are dropped, blanks become None."""
+	row = {}
+	for key, val in raw.items():
+		if key is None: continue
+		field = _ALIASES.get(" ".join(str(key).lower().replace("_", " ").split()).replace("res ", "res_"))
+		if field is None: continue
+		if isinstance(val, str):
+			val = val.strip()
+		if val == "" or val is None: continue
+		row[field] = val
+
+	# "Naboo, Tatooine" in a spreadsheet cell
+	planet = row.get('planet')
+	if isinstance(planet, str) and "," in planet:
+		row['planet'] = [p.strip() for p in planet.split(",") if p.strip()]
+	return row
+
+
+def detect_format(filename="", content_type=""):
+	filename = (filename or "").lower()
+	content_type = (content_type or "").lower()
+	if filename.endswith(".json") or "json" in content_type:
+		return "json"
+	return "csv"
+
+
+def iter_rows(stream, fmt):
+	"""Yields normalized row dicts from a binary stream."""
+	if fmt == "json":
+		data = json.load(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+		if isinstance(data, dict):
+			data = data.get("rows") or data.get("resources") or []
+		if not isinstance(data, list):
+			raise ValueError("JSON import must be a list of rows.")
+		for raw in data:
+			if not isinstance(raw, dict):
+				raise ValueError("JSON import rows must be objects.")
+			yield _normalize(raw)
+		return
+
+	reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+	try:
+		for raw in reader:
+			yield _normalize(raw)
+	except csv.Error as e:
+		raise ValueError(f"Malformed CSV (line {reader.line_num}): {e}")
+
+
+def iter_chunks(rows, size=IMPORT_CHUNK, max_rows=IMPORT_MAX_ROWS):
+	"""
+	Yields (offset, list of up to size rows) from an iterable of rows, reading it only as
+	far as the chunk being yielded. Raises ValueError past max_rows (or from the rows).
+	"""
+	chunk, offset = [], 0
+	for row in rows:
+		if offset + len(chunk) >= max_rows:
+			raise ValueError(f"Import is limited to {max_rows} rows.")
+		chunk.append(row)
+		if len(chunk) == size:
+			yield offset, chunk
+			chunk, offset = [], offset + size
+	if chunk:
+		yield offset, chunk
@@ -0,0 +1,180 @@
+"""
+SWGBuddy IPC Module
+
+Helpers shared by the ServiceManager, the Web process and the Validation workers
+for moving packets between processes.
+
+"""
+import bisect
+import threading
+import time
+import zlib
+from queue import Empty, Full
+
+
+class Overloaded(Exception):
+	"""Raised when a worker queue is past its high-water mark (admission control)."""
+
+	def __init__(self, depth):
+		super().__init__(f"Validation queue depth {depth} is over the high-water mark")
+		self.depth = depth
+
+
+def shard_of(key, shards):
+	"""Stable shard index for a routing key (crc32 is identical across processes, unlike hash())."""
+	if shards == 1:
+		return 0
+	return zlib.crc32(str(key).encode('utf-8')) % shards
+
+
+class ShardRouter:
+	"""
+	Routes validation packets onto a fixed pool of worker queues.
+
+	Packets are sharded by server_id so every write for a given game server is
+	consumed by the same worker (preserving per-server ordering) while different
+	servers are processed in parallel.
+	"""
+
+	def __init__(self, queues, high_water=0):
+		self.queues = list(queues)
+		# 0 disables admission control
+		self.high_water = high_water
+		self.rejected = 0
+
+	def __len__(self):
+		return len(self.queues)
+
+	def shard_for(self, key):
+		return shard_of(key, len(self.queues))
+
+	def route(self, server_id):
+		return self.queues[self.shard_for(server_id)]
+
+	def admit(self, server_id, packet):
+		"""
+		Enqueues the packet on its shard unless that shard is past the high-water mark
+		(or physically full). Raises Overloaded instead of queueing work that would go stale.
+		"""
+		q = self.route(server_id)
+		depth = self._depth(q)
+		if self.high_water and depth is not None and depth >= self.high_water:
+			self.rejected += 1
+			raise Overloaded(depth)
+		try:
+			q.put_nowait(packet)
+		except Full:
+			self.rejected += 1
+			raise Overloaded(depth)
+
+	@staticmethod
+	def _depth(q):
+		try:
+			return q.qsize()
+		except NotImplementedError:
+			# macOS does not implement sem_getvalue()
+			return None
+
+	def depths(self):
+		"""Approximate number of packets waiting in each worker queue."""
+		return [self._depth(q) for q in self.queues]
+
+
+class PendingReply:
+	"""One in-flight request waiting for its reply from a validation worker."""
+	__slots__ = ("cid", "event", "response", "sent_at", "deadline")
+
+	def __init__(self, cid, timeout):
+		self.cid = cid
+		self.event = threading.Event()
+		self.response = None
+		self.sent_at = time.monotonic()
+		self.deadline = self.sent_at + timeout
+
+
+class ReplyRouter:
+	"""
+	Correlates replies from the validation workers with the web threads waiting on them.
+
+	Completion is a dict.pop plus Event.set (no per-request Queue). Replies that arrive
+	after their request gave up are counted and discarded, and registrations past their
+	deadline are swept so nothing leaks if a waiter never cleans up.
+	"""
+	# Upper bounds (ms) of the round-trip latency histogram buckets; the last bucket is open-ended
+	LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+	def __init__(self):
+		self._pending = {}
+		self._stats_lock = threading.Lock()
+		self.latency_histogram = [0] * (len(self.LATENCY_BUCKETS_MS) + 1)
+		self.completed = 0
+		self.late_replies = 0
+		self.expired = 0
+
+	def register(self, cid, timeout):
+		pending = PendingReply(cid, timeout)
+		self._pending[cid] = pending
+		return pending
+
+	def wait(self, pending):
+		"""Blocks until the reply arrives or the deadline passes. Returns the response or None."""
+		pending.event.wait(max(0, pending.deadline - time.monotonic()))
+		self._pending.pop(pending.cid, None)
+		return pending.response
+
+	def discard(self, cid):
+		self._pending.pop(cid, None)
+
+	def complete(self, response):
+		pending = self._pending.pop(response.get('id'), None)
+		if pending is None:
+			# Requester already timed out (or the reply is unsolicited)
+			with self._stats_lock:
+				self.late_replies += 1
+			return False
+
+		pending.response = response
+		pending.event.set()
+
+		elapsed_ms = (time.monotonic() - pending.sent_at) * 1000
+		with self._stats_lock:
+			self.completed += 1
+			self.latency_histogram[bisect.bisect_left(self.LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+		return True
+
+	def expire(self):
+		now = time.monotonic()
+		stale = [cid for cid, p in list(self._pending.items()) if p.deadline < now]
+		for cid in stale:
+			self._pending.pop(cid, None)
+		if stale:
+			with self._stats_lock:
+				self.expired += len(stale)
+
+	def run(self, reply_queue, sweep_interval=1.0):
+		"""Router loop: drains reply_queue forever. Intended for a daemon thread."""
+		last_sweep = time.monotonic()
+		while True:
+			try:
+				try:
+					self.complete(reply_queue.get(timeout=sweep_interval))
+				except Empty:
+					pass
+
+				if time.monotonic() - last_sweep >= sweep_interval:
+					last_sweep = time.monotonic()
+					self.expire()
+			except Exception as e:
+				print(f"Router Error: {e}")
+				time.sleep(1)
+
+	def stats(self):
+		with self._stats_lock:
+			labels = [f"<={b}ms" for b in self.LATENCY_BUCKETS_MS] + [f">{self.LATENCY_BUCKETS_MS[-1]}ms"]
+			return {
+				"in_flight": len(self._pending),
+				"completed": self.completed,
+				"late_replies": self.late_replies,
+				"expired": self.expired,
+				"latency_histogram": dict(zip(labels, self.latency_histogram))
+			}
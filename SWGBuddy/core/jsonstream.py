@@ -0,0 +1,49 @@
+"""
+SWGBuddy JSON Stream Module
+
+Incremental JSON encoding for large responses.
+
+A full resource list used to be built as a list of dicts, then as one JSON string, and
+only then written out. iter_json_list() instead encodes the items a batch at a time and
+yields the text as it goes, so a response's peak memory is one batch however many items
+there are. gzip_chunks() compresses such a stream on the fly, for use as a chunked
+(Transfer-Encoding: chunked) response body.
+
+"""
+import zlib
+
+# Items encoded per yielded chunk
+BATCH = 500
+
+
+def iter_json_list(key, items, fields=None, encode=None, batch=BATCH):
+	"""
+	Yields the JSON text of {key: [items...], **fields} in pieces. items may be any iterable;
+	encode(obj) turns one value (item or field) into JSON text.
+	"""
+	yield '{' + encode(key) + ':['
+	buffer = []
+	first = True
+	for item in items:
+		buffer.append(encode(item))
+		if len(buffer) >= batch:
+			yield ('' if first else ',') + ','.join(buffer)
+			buffer, first = [], False
+	if buffer:
+		yield ('' if first else ',') + ','.join(buffer)
+	yield ']'
+	for name, value in (fields or {}).items():
+		yield ',' + encode(name) + ':' + encode(value)
+	yield '}'
+
+
+def gzip_chunks(chunks, level=6):
+	"""Gzip-compresses an iterable of str/bytes chunks, yielding compressed bytes as they fill."""
+	compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+	for chunk in chunks:
+		if isinstance(chunk, str):
+			chunk = chunk.encode('utf-8')
+		out = compressor.compress(chunk)
+		if out:
+			yield out
+	yield compressor.flush()
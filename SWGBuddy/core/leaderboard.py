@@ -0,0 +1,163 @@
+"""
+SWGBuddy Leaderboard Module
+
+Materialized top-K active spawns per (server, taxonomy node, stat), for "best current
+spawn of class X for stat Y" (GET /api/leaderboard).
+
+Boards exist for every node, not only spawnable classes: a spawn ranks on its own class
+and on each of its ancestors. The Validation worker calls refresh() inside the write
+transaction with the ids it added, updated or retired. A (node, stat) board is recomputed
+only when the spawn is on it or would now make it (board not full, or value at least the
+current K-th), so most writes touch no board at all. Recomputing one board is a top-K
+query over the node's class-id ranges.
+
+A worker builds the boards of any server in its shard that has spawns but none yet when
+it starts, so data from before the boards existed is ranked without a manual step. After
+a taxonomy change they are rebuilt with
+	python -m core.leaderboard [--server cuemu]
+(from the SWGBuddy directory).
+
+"""
+import argparse
+import os
+
+from psycopg2.extras import execute_values
+
+from core.database import DatabaseContext
+from core.taxonomy import STAT_COLS, load_taxonomy
+
+LEADERBOARD_K = int(os.getenv("SWG_LEADERBOARD_K", "10"))
+
+
+class Leaderboards:
+	def __init__(self, taxonomy, k=LEADERBOARD_K):
+		self.taxonomy = taxonomy
+		self.k = k
+		# Per node: the stats that apply anywhere in its subtree
+		self.node_stats = []
+		for i in range(len(taxonomy)):
+			maxima = taxonomy.stat_max[i:taxonomy.subtree_end[i]].max(axis=0).tolist()
+			self.node_stats.append(tuple(stat for stat, mx in zip(STAT_COLS, maxima) if mx > 0))
+
+	def chain(self, class_id):
+		"""Node indices of class_id and its ancestors, leaf first."""
+		index = self.taxonomy.index_by_id.get(int(class_id))
+		chain = []
+		while index is not None and index >= 0:
+			chain.append(index)
+			index = int(self.taxonomy.parent[index])
+		return chain
+
+	def refresh(self, cur, server_id, spawn_ids):
+		"""Recomputes the boards the given (added, updated or retired) spawns are or would be on."""
+		spawn_ids = list(spawn_ids)
+		if not spawn_ids:
+			return 0
+
+		# Boards they are on now: a lower value, deactivation or retirement may drop them
+		cur.execute(
+			"SELECT DISTINCT node_id, stat FROM resource_leaderboard WHERE server_id = %s AND spawn_id = ANY(%s)",
+			(server_id, spawn_ids)
+		)
+		stale = {}
+		for row in cur.fetchall():
+			index = self.taxonomy.index_by_id.get(row['node_id'])
+			if index is not None:
+				stale.setdefault(index, set()).add(row['stat'])
+
+		# Boards they may enter
+		cur.execute(
+			f"SELECT id, resource_class_id, {', '.join(STAT_COLS)} FROM resource_spawns "
+			"WHERE server_id = %s AND id = ANY(%s) AND is_active IS NOT FALSE",
+			(server_id, spawn_ids)
+		)
+		candidates = []
+		for row in cur.fetchall():
+			for index in self.chain(row['resource_class_id']):
+				candidates.extend((index, stat, row[stat]) for stat in self.node_stats[index] if row[stat])
+
+		if candidates:
+			cur.execute(
+				"SELECT node_id, stat, count(*) AS n, min(value) AS low FROM resource_leaderboard "
+				"WHERE server_id = %s AND node_id = ANY(%s) GROUP BY node_id, stat",
+				(server_id, list({int(self.taxonomy.ids[index]) for index, _, _ in candidates}))
+			)
+			boards = {(row['node_id'], row['stat']): (row['n'], row['low']) for row in cur.fetchall()}
+			for index, stat, value in candidates:
+				n, low = boards.get((int(self.taxonomy.ids[index]), stat), (0, None))
+				if n < self.k or value >= low:
+					stale.setdefault(index, set()).add(stat)
+
+		self._recompute(cur, server_id, stale)
+		return sum(len(stats) for stats in stale.values())
+
+	def rebuild(self, cur, server_id):
+		"""Recomputes every board of server_id."""
+		boards = {i: set(stats) for i, stats in enumerate(self.node_stats) if stats}
+		cur.execute("DELETE FROM resource_leaderboard WHERE server_id = %s", (server_id,))
+		self._recompute(cur, server_id, boards)
+		return sum(len(stats) for stats in boards.values())
+
+	def _recompute(self, cur, server_id, boards):
+		"""boards: node index -> stats. Replaces those boards with fresh top-K lists."""
+		if not boards:
+			return
+		rows, node_ids, stats = [], [], []
+		for index, board_stats in boards.items():
+			node_id = int(self.taxonomy.ids[index])
+			ranges = self.taxonomy.subtree_ranges(index)
+			in_node = " OR ".join(["resource_class_id BETWEEN %s AND %s"] * len(ranges))
+			range_params = [bound for pair in ranges for bound in pair]
+
+			parts, params = [], []
+			for stat in sorted(board_stats):
+				parts.append(f"""
+					(SELECT %s AS stat, id, {stat} AS value FROM resource_spawns
+					WHERE server_id = %s AND is_active IS NOT FALSE AND {stat} > 0 AND ({in_node})
+					ORDER BY {stat} DESC, id LIMIT %s)
+				""")
+				params.extend([stat, server_id] + range_params + [self.k])
+				node_ids.append(node_id)
+				stats.append(stat)
+			cur.execute(" UNION ALL ".join(parts), params)
+
+			rank = {}
+			for row in cur.fetchall():
+				rank[row['stat']] = rank.get(row['stat'], 0) + 1
+				rows.append((server_id, node_id, row['stat'], rank[row['stat']], row['id'], row['value']))
+
+		cur.execute(
+			"DELETE FROM resource_leaderboard WHERE server_id = %s "
+			"AND (node_id, stat) IN (SELECT * FROM unnest(%s::int[], %s::text[]))",
+			(server_id, node_ids, stats)
+		)
+		if rows:
+			execute_values(
+				cur,
+				"INSERT INTO resource_leaderboard (server_id, node_id, stat, rank, spawn_id, value) VALUES %s",
+				rows
+			)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--server", help="Only rebuild this server_id (default: every server with spawns)")
+	args = parser.parse_args()
+
+	DatabaseContext.initialize()
+	try:
+		leaderboards = Leaderboards(load_taxonomy(log=print))
+		with DatabaseContext.cursor(commit=True) as cur:
+			if args.server:
+				servers = [args.server]
+			else:
+				cur.execute("SELECT DISTINCT server_id FROM resource_spawns")
+				servers = [row['server_id'] for row in cur.fetchall()]
+			for server_id in servers:
+				print(f"{server_id}: {leaderboards.rebuild(cur, server_id):,} boards rebuilt")
+	finally:
+		DatabaseContext.close_all()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,91 @@
+"""
+SWGBuddy Notify Module
+
+Cross-process broadcast channel built on Postgres LISTEN/NOTIFY.
+
+Publishers call publish() on the cursor of the transaction that made the change, so
+listeners only hear about it once it is committed. Every process that keeps a cache
+(Web, each Validation worker) runs one NotificationListener thread.
+
+"""
+import json
+import select
+import threading
+import time
+import logging
+
+from core.database import DatabaseContext
+
+CHANNEL = "swgbuddy_events"
+
+# Synthetic event dispatched after (re)connecting: anything may have been missed, drop caches.
+RESYNC = "resync"
+
+
+def publish(cur, event, **data):
+	"""Queues a notification on the caller's transaction; delivered to listeners on COMMIT."""
+	data['event'] = event
+	cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps(data, default=str)))
+
+
+class NotificationListener:
+	"""Background thread holding a dedicated LISTEN connection and dispatching events to handlers."""
+
+	def __init__(self, channel=CHANNEL, poll_interval=5):
+		self.channel = channel
+		self.poll_interval = poll_interval
+		self.handlers = {}
+		self.running = False
+		self._thread = None
+
+	def subscribe(self, event, handler):
+		"""Registers handler(payload_dict) for an event name."""
+		self.handlers.setdefault(event, []).append(handler)
+
+	def start(self):
+		if self._thread and self._thread.is_alive():
+			return
+		self.running = True
+		self._thread = threading.Thread(target=self._run, name="NotificationListener", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self.running = False
+
+	def _dispatch(self, event, data):
+		for handler in self.handlers.get(event, []):
+			try:
+				handler(data)
+			except Exception as e:
+				logging.error(f"[Notify] Handler for '{event}' failed: {e}")
+
+	def _run(self):
+		while self.running:
+			conn = None
+			try:
+				conn = DatabaseContext.dedicated_connection(autocommit=True)
+				with conn.cursor() as cur:
+					cur.execute(f"LISTEN {self.channel}")
+				self._dispatch(RESYNC, {"event": RESYNC})
+
+				while self.running:
+					# Wake up periodically so stop() and dead connections are noticed
+					if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+						continue
+					conn.poll()
+					while conn.notifies:
+						note = conn.notifies.pop(0)
+						try:
+							data = json.loads(note.payload)
+						except ValueError:
+							continue
+						self._dispatch(data.get('event'), data)
+			except Exception as e:
+				logging.error(f"[Notify] Listener connection lost: {e}")
+				time.sleep(self.poll_interval)
+			finally:
+				if conn:
+					try:
+						conn.close()
+					except Exception:
+						pass
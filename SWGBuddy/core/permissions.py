@@ -0,0 +1,107 @@
+"""
+SWGBuddy Permissions Module
+
+Per-process role cache shared by the Web process and the Validation workers.
+
+Entries are keyed by (user_id, server_id) and expire after a TTL as a safety net.
+Writers that change roles call publish_invalidation() inside their transaction;
+every process drops the affected entries when the notification arrives.
+
+"""
+import os
+import time
+import threading
+
+from core.database import DatabaseContext
+from core import notify
+
+PERMISSIONS_EVENT = "permissions"
+
+# Key used for the "every server" view served by /api/me
+ALL_SERVERS = "*"
+
+
+def publish_invalidation(cur, user_id=None):
+	"""Broadcasts a role change for one user (or everyone when user_id is None) on COMMIT."""
+	notify.publish(cur, PERMISSIONS_EVENT, user_id=user_id)
+
+
+class PermissionCache:
+	def __init__(self, ttl=None):
+		self.ttl = ttl if ttl is not None else float(os.getenv("SWG_PERMISSION_TTL", "60"))
+		self._entries = {}
+		self._lock = threading.Lock()
+		# Bumped on every invalidation so a lookup racing an invalidation never caches stale data
+		self._generation = 0
+
+	def attach(self, listener):
+		"""Subscribes this cache to the broadcast channel of a NotificationListener."""
+		listener.subscribe(PERMISSIONS_EVENT, lambda data: self.invalidate(data.get('user_id')))
+		listener.subscribe(notify.RESYNC, lambda data: self.invalidate())
+
+	def invalidate(self, user_id=None):
+		with self._lock:
+			self._generation += 1
+			if user_id is None:
+				self._entries.clear()
+				return
+			user_id = str(user_id)
+			for key in [k for k in self._entries if k[0] == user_id]:
+				del self._entries[key]
+
+	def _get(self, key):
+		entry = self._entries.get(key)
+		if entry and entry[0] > time.monotonic():
+			return entry[1]
+		return None
+
+	def _put(self, key, value, generation):
+		with self._lock:
+			if generation == self._generation:
+				self._entries[key] = (time.monotonic() + self.ttl, value)
+
+	def get_role(self, user_id, server_id):
+		"""Effective role of a user on a server ('SUPERADMIN' overrides server permissions)."""
+		key = (str(user_id), server_id)
+		role = self._get(key)
+		if role is not None:
+			return role
+
+		generation = self._generation
+		with DatabaseContext.cursor() as cur:
+			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (user_id,))
+			u = cur.fetchone()
+			if u and u['is_superadmin']:
+				role = 'SUPERADMIN'
+			else:
+				cur.execute("SELECT role FROM server_permissions WHERE user_id = %s AND server_id = %s", (user_id, server_id))
+				p = cur.fetchone()
+				role = p['role'] if p else 'GUEST'
+
+		self._put(key, role, generation)
+		return role
+
+	def get_user_roles(self, user_id):
+		"""Returns (is_superadmin, {server_id: role}) for a user across every server."""
+		key = (str(user_id), ALL_SERVERS)
+		cached = self._get(key)
+		if cached is not None:
+			return cached
+
+		generation = self._generation
+		is_super = False
+		with DatabaseContext.cursor() as cur:
+			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (user_id,))
+			row = cur.fetchone()
+			if row: is_super = row['is_superadmin']
+
+			cur.execute("SELECT server_id, role FROM server_permissions WHERE user_id = %s", (user_id,))
+			perms = {r['server_id']: r['role'] for r in cur.fetchall()}
+
+		result = (is_super, perms)
+		self._put(key, result, generation)
+		return result
+
+
+# One cache per process
+permission_cache = PermissionCache()
@@ -0,0 +1,77 @@
+"""
+SWGBuddy Precompressed Module
+
+Large, rarely changing documents served from bytes built once per version.
+
+The builder runs on first use after an invalidation; its output is kept as identity,
+gzip and (when the brotli package is installed) br variants. Each variant has its own
+strong ETag, the content hash plus a suffix per content-coding (RFC 7232: a strong
+validator differs between encodings). Requests then cost a header check and a buffer write.
+
+"""
+import gzip
+import hashlib
+import threading
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+
+class DocumentVersion:
+	"""One built version of a document: the encoded bodies and their ETags."""
+	__slots__ = ("etag", "bodies")
+
+	# ETag suffix per content-coding
+	SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+	def __init__(self, body):
+		self.etag = hashlib.sha256(body).hexdigest()[:32]
+		self.bodies = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+		if brotli:
+			self.bodies["br"] = brotli.compress(body, quality=11)
+
+	def etag_for(self, encoding):
+		return self.etag + self.SUFFIXES[encoding]
+
+	@property
+	def encodings(self):
+		# Server preference when the client accepts several with equal weight
+		return [e for e in ("br", "gzip", "identity") if e in self.bodies]
+
+
+class PrecompressedDocument:
+	def __init__(self, builder):
+		"""builder() returns the identity body as bytes."""
+		self.builder = builder
+		self._version = None
+		self._lock = threading.Lock()
+		self._build_lock = threading.Lock()
+		# Bumped on every invalidation so a build racing an invalidation is never kept
+		self._generation = 0
+
+	def invalidate(self):
+		with self._lock:
+			self._generation += 1
+			self._version = None
+
+	def get(self):
+		"""Returns the current DocumentVersion, building it if needed. Builder errors propagate."""
+		version = self._version
+		if version is not None:
+			return version
+
+		# Single-flight: concurrent first requests wait for one build instead of each compressing
+		with self._build_lock:
+			version = self._version
+			if version is not None:
+				return version
+			with self._lock:
+				generation = self._generation
+
+			version = DocumentVersion(self.builder())
+			with self._lock:
+				if generation == self._generation:
+					self._version = version
+			return version
@@ -0,0 +1,153 @@
+"""
+SWGBuddy Query Module
+
+Filtered, sorted, keyset-paginated reads of resource_spawns (GET /api/resources/query),
+for clients that only want the page they are looking at instead of the whole log.
+
+Every sort key is a NOT NULL expression (stats use COALESCE(stat, 0), so spawns without
+the stat sort last when descending) and has a matching (server_id, key, id) index, see
+sort_index_ddl(). A page is then "WHERE server_id = ? AND (key, id) < (last key, last id)
+ORDER BY key DESC, id DESC LIMIT n", one index range scan however deep the client pages.
+The position is handed back as an opaque token.
+
+"""
+import base64
+import json
+
+from core.taxonomy import STAT_COLS
+
+# sort name -> SQL expression
+SORT_KEYS = {
+	"date_reported": "date_reported",
+	"name": "name",
+	"res_weight_rating": "COALESCE(res_weight_rating, 0)",
+}
+for _stat in STAT_COLS:
+	SORT_KEYS[_stat] = f"COALESCE({_stat}, 0)"
+
+DEFAULT_SORT = "date_reported"
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+_SELECT = """
+	SELECT rs.*,
+		   {key} AS sort_key,
+		   rt.class_label as type,
+		   u.username as reporter_name,
+		   EXTRACT(EPOCH FROM rs.date_reported) as date_reported_ts,
+		   EXTRACT(EPOCH FROM rs.last_modified) as last_modified_ts
+	FROM resource_spawns rs
+	JOIN resource_taxonomy rt ON rs.resource_class_id = rt.id
+	LEFT JOIN users u ON rs.reporter_id = u.discord_id
+	WHERE {where}
+	ORDER BY {key} {direction}, rs.id {direction}
+	LIMIT %s
+"""
+
+
+def sort_index_ddl():
+	"""One CREATE INDEX per sort key; applied with the other migrations."""
+	return [
+		f"CREATE INDEX IF NOT EXISTS resource_spawns_sort_{name}_idx ON resource_spawns (server_id, ({expr}), id)"
+		for name, expr in SORT_KEYS.items()
+	]
+
+
+def encode_token(sort_key, spawn_id):
+	# The key travels as text and comes back as an untyped literal, which Postgres reads as
+	# the key column's own type; a typed parameter could cast the column and miss the index
+	raw = json.dumps([str(sort_key), spawn_id], separators=(',', ':')).encode('utf-8')
+	return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+
+def decode_token(token):
+	"""Returns (sort key, spawn id). Raises ValueError for a malformed token."""
+	try:
+		raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+		key, spawn_id = json.loads(raw)
+	except Exception:
+		raise ValueError("Invalid page token.")
+	if not isinstance(key, str) or not isinstance(spawn_id, int):
+		raise ValueError("Invalid page token.")
+	return key, spawn_id
+
+
+class ResourceQuery:
+	"""
+	Parsed query parameters. Raises ValueError on anything malformed.
+
+	sort: a SORT_KEYS name; dir: asc | desc; limit: 1..MAX_LIMIT; after: page token;
+	ranges: resource_class_id intervals (from the category); planet; active: true | false;
+	min_<stat> (or min_oq etc.): lower bound per stat.
+	"""
+
+	def __init__(self, server_id, args, ranges=None):
+		self.server_id = server_id
+		self.ranges = ranges
+
+		self.sort = args.get('sort') or DEFAULT_SORT
+		if self.sort not in SORT_KEYS:
+			raise ValueError(f"Cannot sort by {self.sort}.")
+		self.descending = (args.get('dir') or ("asc" if self.sort == "name" else "desc")).lower() != "asc"
+
+		try:
+			self.limit = int(args.get('limit') or DEFAULT_LIMIT)
+		except ValueError:
+			raise ValueError("limit must be a number.")
+		self.limit = max(1, min(self.limit, MAX_LIMIT))
+
+		self.after = decode_token(args['after']) if args.get('after') else None
+		# Stored capitalized, as the validator normalizes them
+		self.planet = (args.get('planet') or "").strip().capitalize() or None
+
+		active = (args.get('active') or "").lower()
+		if active not in ("", "true", "false", "1", "0"):
+			raise ValueError("active must be true or false.")
+		self.active = None if active == "" else active in ("true", "1")
+
+		self.minimums = {}
+		for stat in STAT_COLS:
+			value = args.get(f"min_{stat}") or args.get(f"min_{stat[4:]}")
+			if value:
+				try:
+					self.minimums[stat] = float(value)
+				except ValueError:
+					raise ValueError(f"min_{stat} must be a number.")
+
+	def sql(self):
+		"""Returns (sql, params) for one page (limit + 1 rows, to know whether more follow)."""
+		key = SORT_KEYS[self.sort].replace(self.sort, f"rs.{self.sort}")
+		where, params = ["rs.server_id = %s"], [self.server_id]
+
+		if self.ranges:
+			where.append("(" + " OR ".join(["rs.resource_class_id BETWEEN %s AND %s"] * len(self.ranges)) + ")")
+			for lo, hi in self.ranges:
+				params.extend((lo, hi))
+		if self.planet:
+			where.append("%s = ANY(rs.planet)")
+			params.append(self.planet)
+		if self.active is not None:
+			where.append("rs.is_active = %s")
+			params.append(self.active)
+		for stat, minimum in self.minimums.items():
+			where.append(f"rs.{stat} >= %s")
+			params.append(minimum)
+		if self.after is not None:
+			# Row comparison: matches the (server_id, key, id) index order
+			where.append(f"({key}, rs.id) {'<' if self.descending else '>'} (%s, %s)")
+			params.extend(self.after)
+
+		sql = _SELECT.format(key=key, where=" AND ".join(where), direction="DESC" if self.descending else "ASC")
+		params.append(self.limit + 1)
+		return sql, params
+
+	def page(self, rows):
+		"""Splits the fetched rows into (rows for this page, token for the next one or None)."""
+		rows = list(rows)
+		token = None
+		if len(rows) > self.limit:
+			rows = rows[:self.limit]
+			token = encode_token(rows[-1]['sort_key'], rows[-1]['id'])
+		for row in rows:
+			row.pop('sort_key', None)
+		return rows, token
@@ -0,0 +1,191 @@
+"""
+SWGBuddy Recompute Module
+
+Recomputes the stored *_rating columns and res_weight_rating against the current
+taxonomy caps, e.g. after resource_taxonomy.json was regenerated with corrected min/max.
+
+Spawns are read in id-ordered chunks as one row of per-column arrays (array_agg), so a
+chunk lands in NumPy without a per-row Python loop. The ratings are recomputed with the
+same formula as ResourceValidator.validate, and only the rows whose stored values
+actually changed are written back, with one UPDATE ... FROM unnest(...) per chunk.
+
+Usage (from the SWGBuddy directory):
+	python -m core.recompute [--server cuemu] [--chunk 20000] [--dry-run]
+
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from core.database import DatabaseContext
+from core.snapshot import publish_spawn_changes
+from core.taxonomy import RATING_COLS, STAT_COLS, load_taxonomy
+
+TABLES = ("resource_spawns", "retired_resources")
+
+# Stored ratings are compared with this tolerance (the columns may be single precision)
+TOLERANCE = 1e-6
+
+
+def round3(values):
+	"""
+	round(x, 3) element-wise, bit-identical to Python's round().
+
+	np.round scales by 1000 before rounding, which differs from Python on values sitting
+	on a .0005 tie; those few are re-rounded in Python.
+	"""
+	out = np.round(values, 3)
+	scaled = values * 1000.0
+	near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+	if near_tie.any():
+		out[near_tie] = [round(float(v), 3) for v in values[near_tie]]
+	return out
+
+
+class CapTable:
+	"""Stat maxima per resource class, as a (classes x STAT_COLS) matrix (0 = not applicable)."""
+
+	def __init__(self, validators):
+		by_class = {}
+		for validator in validators.values():
+			by_class[int(validator.class_id)] = [bound[1] if bound else 0 for bound in validator.bounds]
+		self.class_ids = np.array(sorted(by_class), dtype=np.int64)
+		self.caps = np.array([by_class[c] for c in self.class_ids], dtype=np.float64).reshape(-1, len(STAT_COLS))
+
+	def lookup(self, class_ids):
+		"""Returns (caps for each row, mask of rows whose class is still spawnable)."""
+		idx = np.searchsorted(self.class_ids, class_ids)
+		idx = np.minimum(idx, len(self.class_ids) - 1)
+		known = self.class_ids[idx] == class_ids
+		return self.caps[idx], known
+
+
+def compute_ratings(stats, caps):
+	"""
+	stats: (n x STAT_COLS) with NaN for NULL; caps: matching maxima.
+	Returns (ratings with NaN for NULL, res_weight_rating).
+	"""
+	applies = ~np.isnan(stats) & (stats != 0) & (caps > 0)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		ratings = np.where(applies, round3(np.where(applies, stats / np.where(caps > 0, caps, 1), 0.0)), np.nan)
+
+	# Column by column, like the validator's running sum, so the float sums are identical
+	total = np.zeros(len(stats))
+	for i in range(stats.shape[1]):
+		total += np.where(applies[:, i], ratings[:, i], 0.0)
+	count = applies.sum(axis=1)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		weight = np.where(count > 0, round3(total / np.maximum(count, 1)), 0.0)
+	return ratings, weight
+
+
+def _changed(old, new):
+	same = np.isclose(old, new, rtol=0, atol=TOLERANCE) | (np.isnan(old) & np.isnan(new))
+	return ~same
+
+
+def _array(values, dtype=np.float64):
+	# None (SQL NULL) becomes NaN
+	return np.array(values, dtype=dtype)
+
+
+def _nullable(column):
+	return [None if np.isnan(v) else float(v) for v in column]
+
+
+def recompute_table(table, caps, server_id=None, chunk=20000, dry_run=False, log=print):
+	"""Recomputes one table. Returns (rows scanned, rows updated, rows skipped for unknown class)."""
+	cols = ("id", "resource_class_id") + STAT_COLS + RATING_COLS + ("res_weight_rating",)
+	select_sql = f"""
+		SELECT {', '.join(f'array_agg({c} ORDER BY id) AS {c}' for c in cols)}
+		FROM (
+			SELECT {', '.join(cols)} FROM {table}
+			WHERE id > %s {'AND server_id = %s' if server_id else ''}
+			ORDER BY id LIMIT %s
+		) AS chunk
+	"""
+	update_sql = f"""
+		UPDATE {table} AS t SET
+			{', '.join(f'{c} = u.{c}' for c in RATING_COLS + ('res_weight_rating',))}
+		FROM unnest(%s::bigint[], {', '.join(['%s::float8[]'] * (len(RATING_COLS) + 1))})
+			AS u(id, {', '.join(RATING_COLS + ('res_weight_rating',))})
+		WHERE t.id = u.id
+	"""
+
+	last_id, scanned, updated, unknown = 0, 0, 0, 0
+	chunks = 0
+	while True:
+		params = (last_id, server_id, chunk) if server_id else (last_id, chunk)
+		with DatabaseContext.cursor(commit=not dry_run) as cur:
+			cur.execute(select_sql, params)
+			row = cur.fetchone()
+			if not row or not row['id']:
+				break
+
+			ids = _array(row['id'], np.int64)
+			class_ids = _array(row['resource_class_id'], np.int64)
+			stats = np.column_stack([_array(row[c]) for c in STAT_COLS])
+			stored = np.column_stack([_array(row[c]) for c in RATING_COLS])
+			stored_weight = _array(row['res_weight_rating'])
+
+			row_caps, known = caps.lookup(class_ids)
+			ratings, weight = compute_ratings(stats, row_caps)
+
+			# Types no longer in the taxonomy keep their ratings
+			dirty = known & (_changed(stored, ratings).any(axis=1) | _changed(stored_weight, weight))
+			if dirty.any() and not dry_run:
+				cur.execute(update_sql, [ids[dirty].tolist()] + [_nullable(ratings[dirty, i]) for i in range(len(RATING_COLS))] + [weight[dirty].tolist()])
+
+			scanned += len(ids)
+			updated += int(dirty.sum())
+			unknown += int((~known).sum())
+			last_id = int(ids[-1])
+
+		chunks += 1
+		if log and chunks % 10 == 0:
+			log(f"  {table}: {scanned:,} scanned, {updated:,} changed")
+	return scanned, updated, unknown
+
+
+def recompute_ratings(validators, server_id=None, chunk=20000, dry_run=False, tables=TABLES, log=print):
+	"""Recomputes every table; returns {table: {"scanned", "updated", "unknown_class", "rows_per_sec"}}."""
+	caps = CapTable(validators)
+	report = {}
+	for table in tables:
+		started = time.perf_counter()
+		scanned, updated, unknown = recompute_table(table, caps, server_id, chunk, dry_run, log)
+		elapsed = time.perf_counter() - started
+		report[table] = {
+			"scanned": scanned,
+			"updated": updated,
+			"unknown_class": unknown,
+			"rows_per_sec": round(scanned / elapsed) if elapsed > 0 else 0
+		}
+		if log:
+			log(f"{table}: {scanned:,} rows in {elapsed:.1f}s ({report[table]['rows_per_sec']:,} rows/s), "
+				f"{updated:,} {'would change' if dry_run else 'updated'}, {unknown:,} with unknown class")
+	return report
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--server", help="Only recompute this server_id (default: all servers)")
+	parser.add_argument("--chunk", type=int, default=int(os.getenv("SWG_RECOMPUTE_CHUNK", "20000")))
+	parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+	args = parser.parse_args()
+
+	DatabaseContext.initialize()
+	try:
+		report = recompute_ratings(load_taxonomy(log=print).validators(), args.server, args.chunk, args.dry_run)
+		if not args.dry_run and report["resource_spawns"]["updated"]:
+			# The web snapshots diff themselves against the database on reload
+			with DatabaseContext.cursor(commit=True) as cur:
+				publish_spawn_changes(cur, args.server)
+	finally:
+		DatabaseContext.close_all()
+
+
+if __name__ == "__main__":
+	main()
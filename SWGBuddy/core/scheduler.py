@@ -0,0 +1,105 @@
+"""
+SWGBuddy Scheduler Module
+
+Priority lanes for the Validation workers.
+
+Packets drained from a worker queue are sorted into lanes by action. Lanes are served
+with deficit round robin: every round, each lane may take up to its weight in packets,
+in priority order (interactive writes, then auth sync, then admin/housekeeping). A burst
+in a low lane therefore cannot delay writes by more than one of its quanta, and a busy
+high lane cannot starve the others.
+
+"""
+import time
+from collections import deque
+
+# (lane, weight) in priority order
+DEFAULT_LANES = (("write", 16), ("auth", 4), ("admin", 1))
+
+ACTION_LANES = {
+	"add_resource": "write",
+	"update_resource": "write",
+	"retire_resource": "write",
+	"sync_user": "auth",
+	# Bulk import chunks are large; one per admin turn keeps them from delaying single writes
+	"import_resources": "admin",
+}
+DEFAULT_LANE = "admin"
+
+
+class Lane:
+	__slots__ = ("name", "weight", "packets", "deficit", "served", "wait_ms_total", "wait_ms_max", "run_ms_total")
+
+	def __init__(self, name, weight):
+		self.name = name
+		self.weight = weight
+		self.packets = deque()
+		self.deficit = 0
+		self.served = 0
+		self.wait_ms_total = 0.0
+		self.wait_ms_max = 0.0
+		self.run_ms_total = 0.0
+
+	def stats(self):
+		return {
+			"weight": self.weight,
+			"queued": len(self.packets),
+			"served": self.served,
+			"avg_wait_ms": round(self.wait_ms_total / self.served, 2) if self.served else 0.0,
+			"max_wait_ms": round(self.wait_ms_max, 2),
+			"avg_run_ms": round(self.run_ms_total / self.served, 2) if self.served else 0.0
+		}
+
+
+class LaneScheduler:
+	def __init__(self, lanes=DEFAULT_LANES, action_lanes=ACTION_LANES):
+		self.lanes = [Lane(name, weight) for name, weight in lanes]
+		self._by_name = {lane.name: lane for lane in self.lanes}
+		self.action_lanes = action_lanes
+		self._cursor = 0
+
+	def __len__(self):
+		return sum(len(lane.packets) for lane in self.lanes)
+
+	def lane_for(self, action):
+		return self._by_name.get(self.action_lanes.get(action, DEFAULT_LANE), self.lanes[-1])
+
+	def push(self, packet):
+		# Queue wait is measured from when the web process sent the packet, if it says so
+		packet.setdefault('sent_at', time.time())
+		self.lane_for(packet.get('action')).packets.append(packet)
+
+	def next_batch(self):
+		"""Returns (lane, [packets]) for the next lane turn, or (None, []) when idle."""
+		if not len(self):
+			return None, []
+
+		while True:
+			lane = self.lanes[self._cursor]
+			if not lane.packets:
+				# Idle lanes do not bank credit
+				lane.deficit = 0
+				self._cursor = (self._cursor + 1) % len(self.lanes)
+				continue
+
+			if lane.deficit <= 0:
+				lane.deficit += lane.weight
+
+			take = min(lane.deficit, len(lane.packets))
+			batch = [lane.packets.popleft() for _ in range(take)]
+			lane.deficit -= take
+			if lane.deficit <= 0 or not lane.packets:
+				self._cursor = (self._cursor + 1) % len(self.lanes)
+			return lane, batch
+
+	def record(self, lane, batch, run_seconds):
+		now = time.time()
+		lane.served += len(batch)
+		lane.run_ms_total += run_seconds * 1000
+		for packet in batch:
+			wait_ms = (now - run_seconds - packet['sent_at']) * 1000
+			lane.wait_ms_total += wait_ms
+			lane.wait_ms_max = max(lane.wait_ms_max, wait_ms)
+
+	def stats(self):
+		return {lane.name: lane.stats() for lane in self.lanes}
@@ -0,0 +1,169 @@
+"""
+SWGBuddy Schema Module
+
+Idempotent DDL that the services rely on. Applied by every Validation worker at
+startup; an advisory lock serializes concurrent workers so IF NOT EXISTS never races.
+
+"""
+from core.database import DatabaseContext
+from core.query import sort_index_ddl
+from core.taxonomy import PCT_COLS
+
+# pg_advisory_xact_lock key ("SWGB")
+SCHEMA_LOCK_ID = 0x53574742
+
+MIGRATIONS = [
+	# Backs the single round-trip insert-if-absent used by the write pipeline
+	"CREATE UNIQUE INDEX IF NOT EXISTS resource_spawns_server_name_uq ON resource_spawns (server_id, name)",
+	# Category filter: resource_class_id BETWEEN lo AND hi within a server
+	"CREATE INDEX IF NOT EXISTS resource_spawns_server_class_idx ON resource_spawns (server_id, resource_class_id)",
+
+	# Change sequence: every insert/update of a spawn takes the next value, so "what changed
+	# since N" is an index range scan on (server_id, change_seq). Writes for one server are
+	# serialized by the worker that owns its shard, so per server, seq order is commit order
+	# (core.recompute is the exception; the snapshot treats its rows as a resync).
+	"CREATE SEQUENCE IF NOT EXISTS resource_change_seq",
+	"""
+	DO $$
+	BEGIN
+		IF NOT EXISTS (
+			SELECT 1 FROM information_schema.columns
+			WHERE table_name = 'resource_spawns' AND column_name = 'change_seq'
+		) THEN
+			ALTER TABLE resource_spawns ADD COLUMN change_seq bigint;
+			UPDATE resource_spawns SET change_seq = nextval('resource_change_seq');
+			ALTER TABLE resource_spawns ALTER COLUMN change_seq SET DEFAULT nextval('resource_change_seq');
+			ALTER TABLE resource_spawns ALTER COLUMN change_seq SET NOT NULL;
+		END IF;
+	END $$
+	""",
+	# Retiring copies rows with INSERT ... SELECT *, so both tables keep the same columns
+	"ALTER TABLE retired_resources ADD COLUMN IF NOT EXISTS change_seq bigint",
+	"""
+	CREATE OR REPLACE FUNCTION resource_spawns_bump_seq() RETURNS trigger AS $$
+	BEGIN
+		NEW.change_seq := nextval('resource_change_seq');
+		RETURN NEW;
+	END
+	$$ LANGUAGE plpgsql
+	""",
+	"DROP TRIGGER IF EXISTS resource_spawns_change_seq ON resource_spawns",
+	"""
+	CREATE TRIGGER resource_spawns_change_seq BEFORE INSERT OR UPDATE ON resource_spawns
+	FOR EACH ROW EXECUTE FUNCTION resource_spawns_bump_seq()
+	""",
+	"CREATE INDEX IF NOT EXISTS resource_spawns_server_seq_idx ON resource_spawns (server_id, change_seq)",
+
+	# One row per retirement, on the same change sequence, so delta clients learn about removals
+	"""
+	CREATE TABLE IF NOT EXISTS resource_tombstones (
+		server_id text NOT NULL,
+		spawn_id bigint NOT NULL,
+		change_seq bigint NOT NULL DEFAULT nextval('resource_change_seq'),
+		retired_at timestamptz NOT NULL DEFAULT now()
+	)
+	""",
+	"CREATE INDEX IF NOT EXISTS resource_tombstones_server_seq_idx ON resource_tombstones (server_id, change_seq)",
+
+	# Top-K active spawns per (server, taxonomy node, stat), see core.leaderboard
+	"""
+	CREATE TABLE IF NOT EXISTS resource_leaderboard (
+		server_id text NOT NULL,
+		node_id integer NOT NULL,
+		stat text NOT NULL,
+		rank smallint NOT NULL,
+		spawn_id bigint NOT NULL,
+		value double precision NOT NULL,
+		PRIMARY KEY (server_id, node_id, stat, rank)
+	)
+	""",
+	"CREATE INDEX IF NOT EXISTS resource_leaderboard_spawn_idx ON resource_leaderboard (server_id, spawn_id)",
+
+	# Per-class history of retired spawns, maintained at retire time (see core.history)
+	"""
+	CREATE TABLE IF NOT EXISTS resource_history (
+		server_id text NOT NULL,
+		class_id integer NOT NULL,
+		spawns bigint NOT NULL,
+		first_seen timestamptz,
+		last_seen timestamptz,
+		PRIMARY KEY (server_id, class_id)
+	)
+	""",
+	"""
+	CREATE TABLE IF NOT EXISTS resource_history_stats (
+		server_id text NOT NULL,
+		class_id integer NOT NULL,
+		stat text NOT NULL,
+		n bigint NOT NULL,
+		total double precision NOT NULL,
+		total_sq double precision NOT NULL,
+		min_value double precision NOT NULL,
+		max_value double precision NOT NULL,
+		best_spawn_id bigint,
+		best_name text,
+		PRIMARY KEY (server_id, class_id, stat)
+	)
+	""",
+	"""
+	CREATE TABLE IF NOT EXISTS resource_history_buckets (
+		server_id text NOT NULL,
+		class_id integer NOT NULL,
+		stat text NOT NULL,
+		bucket smallint NOT NULL,
+		n bigint NOT NULL,
+		PRIMARY KEY (server_id, class_id, stat, bucket)
+	)
+	""",
+
+	# Per-stat class percentiles stored on the row (see core.sketch). Both tables get the
+	# columns in the same order, for the INSERT ... SELECT * retire
+	"ALTER TABLE resource_spawns " + ", ".join(f"ADD COLUMN IF NOT EXISTS {col} real" for col in PCT_COLS),
+	"ALTER TABLE retired_resources " + ", ".join(f"ADD COLUMN IF NOT EXISTS {col} real" for col in PCT_COLS),
+	"""
+	CREATE TABLE IF NOT EXISTS resource_stat_sketch (
+		server_id text NOT NULL,
+		class_id integer NOT NULL,
+		stat text NOT NULL,
+		counts integer[] NOT NULL,
+		updated_at timestamptz NOT NULL DEFAULT now(),
+		PRIMARY KEY (server_id, class_id, stat)
+	)
+	""",
+
+	# Keyset pagination of /api/resources/query: one (server_id, sort key, id) index per sort key
+	*sort_index_ddl(),
+]
+
+
+def _check_duplicate_names(cur):
+	"""
+	Raises RuntimeError naming the (server_id, name) pairs that would fail the unique index,
+	so an operator can merge or retire them by hand. Once the index exists there are none.
+	"""
+	cur.execute("SELECT to_regclass('resource_spawns_server_name_uq') IS NOT NULL AS present")
+	if cur.fetchone()['present']:
+		return
+	cur.execute("""
+		SELECT server_id, name, array_agg(id ORDER BY id) AS ids
+		FROM resource_spawns GROUP BY server_id, name HAVING count(*) > 1
+		ORDER BY server_id, name
+	""")
+	duplicates = cur.fetchall()
+	if duplicates:
+		listed = "; ".join(f"{row['server_id']}/{row['name']} (ids {', '.join(map(str, row['ids']))})" for row in duplicates[:20])
+		more = f" and {len(duplicates) - 20} more" if len(duplicates) > 20 else ""
+		raise RuntimeError(
+			f"resource_spawns has {len(duplicates)} duplicate (server_id, name) spawn(s), which must be "
+			f"merged or deleted before resource_spawns_server_name_uq can be created: {listed}{more}"
+		)
+
+
+def apply_schema():
+	"""Runs every migration in one transaction. Raises on failure."""
+	with DatabaseContext.cursor(commit=True) as cur:
+		cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+		_check_duplicate_names(cur)
+		for statement in MIGRATIONS:
+			cur.execute(statement)
+	return len(MIGRATIONS)
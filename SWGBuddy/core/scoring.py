@@ -0,0 +1,191 @@
+"""
+SWGBuddy Scoring Module
+
+Schematic-weighted scoring of every active spawn on a server (GET /api/score).
+
+A schematic weighs a few stats, e.g. 66% OQ + 33% SR. A spawn's score is the weighted mean
+of its raw stat values (0-1000), a missing stat counting as 0, optionally limited to a
+taxonomy subtree. Scores are computed in one NumPy pass over a per-server stat matrix:
+
+	stats   (STAT_COLS x rows) float32, column-major so a weight vector is one matvec
+	ids, class_ids, usable (active and not removed)
+
+The matrix is derived from the web process's SnapshotStore and kept current from the
+snapshot's change log (changes_since): changed spawns are overwritten in place or
+appended, removed ones are masked out. It is rebuilt from scratch only when the log
+cannot answer, or once more than a quarter of its rows are dead.
+
+"""
+import threading
+import time
+
+import numpy as np
+
+from core.taxonomy import STAT_COLS
+
+DEFAULT_TOP = 25
+MAX_TOP = 500
+
+
+def parse_weights(text):
+	"""
+	"oq:66,sr:33" (or res_oq=66;...) -> float32 vector over STAT_COLS, normalized to sum 1.
+	Raises ValueError.
+	"""
+	weights = np.zeros(len(STAT_COLS), dtype=np.float32)
+	for part in str(text or "").replace(";", ",").split(","):
+		if not part.strip():
+			continue
+		stat, sep, value = part.replace("=", ":").partition(":")
+		stat = stat.strip().lower()
+		if not stat.startswith("res_"):
+			stat = f"res_{stat}"
+		if not sep or stat not in STAT_COLS:
+			raise ValueError(f"Bad weight '{part.strip()}', expected e.g. oq:66,sr:33.")
+		try:
+			weight = float(value)
+		except ValueError:
+			raise ValueError(f"Bad weight '{part.strip()}', expected e.g. oq:66,sr:33.")
+		if weight < 0:
+			raise ValueError("Weights cannot be negative.")
+		weights[STAT_COLS.index(stat)] += weight
+	total = weights.sum()
+	if total <= 0:
+		raise ValueError("At least one positive stat weight is required.")
+	return weights / total
+
+
+class StatMatrix:
+	"""Stats of one server's spawns. Not thread-safe on its own; ScoringEngine serializes access."""
+
+	def __init__(self, columns, records, version):
+		self.columns = columns
+		self.version = version
+		self._stat_pos = [columns.index(stat) for stat in STAT_COLS]
+		self._active_pos = columns.index('is_active') if 'is_active' in columns else None
+
+		# Bulk build: one conversion per array rather than per-row assignments
+		n = len(records)
+		capacity = max(64, n)
+		self.stats = np.zeros((len(STAT_COLS), capacity), dtype=np.float32)
+		self.ids = np.zeros(capacity, dtype=np.int64)
+		self.class_ids = np.zeros(capacity, dtype=np.int32)
+		self.usable = np.zeros(capacity, dtype=np.bool_)
+		if n:
+			self.stats[:, :n] = np.array(
+				[[r.values[pos] or 0 for pos in self._stat_pos] for r in records], dtype=np.float32
+			).T
+			self.ids[:n] = [r.id for r in records]
+			self.class_ids[:n] = [r.class_id for r in records]
+			self.usable[:n] = [self._usable(r) for r in records]
+		self.size = n
+		self.dead = 0
+		self.row_of = {r.id: row for row, r in enumerate(records)}
+
+	def _usable(self, record):
+		return self._active_pos is None or record.values[self._active_pos] is not False
+
+	def _grow(self):
+		capacity = self.ids.shape[0] * 2
+		self.stats = np.concatenate([self.stats, np.zeros_like(self.stats)], axis=1)
+		self.ids = np.resize(self.ids, capacity)
+		self.class_ids = np.resize(self.class_ids, capacity)
+		self.usable = np.concatenate([self.usable, np.zeros(capacity - self.usable.shape[0], dtype=np.bool_)])
+
+	def put(self, record):
+		row = self.row_of.get(record.id)
+		if row is None:
+			if self.size == self.ids.shape[0]:
+				self._grow()
+			row = self.row_of[record.id] = self.size
+			self.size += 1
+			self.ids[row] = record.id
+		values = record.values
+		self.stats[:, row] = [values[pos] or 0 for pos in self._stat_pos]
+		self.class_ids[row] = record.class_id
+		self.usable[row] = self._usable(record)
+
+	def remove(self, spawn_id):
+		row = self.row_of.pop(spawn_id, None)
+		if row is not None:
+			self.usable[row] = False
+			self.dead += 1
+
+	def score(self, weights, ranges=None, top=DEFAULT_TOP):
+		"""Returns [(spawn id, score)] best first: weighted mean over the usable rows in ranges."""
+		n = self.size
+		mask = self.usable[:n].copy()
+		if ranges:
+			classes = self.class_ids[:n]
+			in_ranges = np.zeros(n, dtype=np.bool_)
+			for lo, hi in ranges:
+				in_ranges |= (classes >= lo) & (classes <= hi)
+			mask &= in_ranges
+
+		rows = np.flatnonzero(mask)
+		if not len(rows):
+			return []
+		# Only the weighted stats take part in the product
+		used = np.flatnonzero(weights)
+		scores = weights[used] @ self.stats[np.ix_(used, rows)]
+
+		top = min(top, len(rows))
+		best = np.argpartition(-scores, top - 1)[:top]
+		best = best[np.lexsort((self.ids[rows[best]], -scores[best]))]
+		return list(zip(self.ids[rows[best]].tolist(), np.round(scores[best].astype(np.float64), 2).tolist()))
+
+
+class ScoringEngine:
+	"""One StatMatrix per server, following the SnapshotStore."""
+
+	def __init__(self, store):
+		self.store = store
+		self._matrices = {}
+		self._locks = {}
+		self._lock = threading.Lock()
+
+	def _server_lock(self, server_id):
+		with self._lock:
+			return self._locks.setdefault(server_id, threading.Lock())
+
+	def _current(self, snapshot):
+		"""Brings the server's matrix up to the snapshot's version. Caller holds the server lock."""
+		matrix = self._matrices.get(snapshot.server_id)
+		version = snapshot.version
+		if matrix is not None and matrix.columns == snapshot.columns:
+			if matrix.version == version:
+				return matrix
+			delta = snapshot.changes_since(matrix.version, version)
+			if delta is not None:
+				records, removed = delta
+				for record in records:
+					matrix.put(record)
+				for spawn_id in removed:
+					matrix.remove(spawn_id)
+				matrix.version = version
+				if matrix.dead * 4 <= matrix.size:
+					return matrix
+
+		matrix = self._matrices[snapshot.server_id] = StatMatrix(snapshot.columns, snapshot.all_records(), version)
+		return matrix
+
+	def score(self, server_id, weights, ranges=None, top=DEFAULT_TOP):
+		"""
+		Returns (snapshot, [(record, score)], milliseconds spent scoring). Database errors
+		from loading the snapshot propagate.
+		"""
+		snapshot = self.store.get(server_id)
+		with self._server_lock(server_id):
+			matrix = self._current(snapshot)
+			started = time.perf_counter()
+			ranked = matrix.score(weights, ranges, min(top, MAX_TOP))
+			elapsed = (time.perf_counter() - started) * 1000
+
+		records = snapshot.records
+		return snapshot, [(records[i], s) for i, s in ranked if i in records], elapsed
+
+	def stats(self):
+		return {
+			server_id: {"rows": m.size, "dead": m.dead, "version": m.version}
+			for server_id, m in list(self._matrices.items())
+		}
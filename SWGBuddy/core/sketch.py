@@ -0,0 +1,127 @@
+"""
+SWGBuddy Sketch Module
+
+Per-stat percentiles of a spawn within its class's history, stored on the row at write
+time (res_oq_pct etc.), so readers pay nothing.
+
+Stats are integers 0..1000, so the "sketch" of a (server, class, stat) distribution is an
+exact fixed histogram: 1001 counters, one per value. A spawn's percentile is the share of
+the class's spawns below it, counting ties as half, with the spawn itself included.
+
+Each Validation worker only writes for the servers in its shard, so it holds those
+servers' histograms in memory. They are loaded on the first write for a server, from
+resource_stat_sketch or, before it has any rows for that server, built once from
+resource_spawns and retired_resources. Every add counts its stats; the changed histograms
+are written back every SWG_SKETCH_FLUSH seconds and at shutdown, so a crash loses at most
+that window of counts. Edits do not re-count (the old values are not known); they only
+refresh the edited row's own percentiles.
+
+"""
+import os
+import time
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from core.database import DatabaseContext
+from core.taxonomy import STAT_COLS
+
+MAX_VALUE = 1000
+
+_BOOTSTRAP = f"""
+	SELECT resource_class_id AS class_id, s.stat, s.value::int AS value, count(*) AS n
+	FROM (
+		SELECT resource_class_id, {', '.join(STAT_COLS)} FROM resource_spawns WHERE server_id = %s
+		UNION ALL
+		SELECT resource_class_id, {', '.join(STAT_COLS)} FROM retired_resources WHERE server_id = %s
+	) AS spawns
+	CROSS JOIN LATERAL (VALUES {', '.join(f"('{stat}', {stat})" for stat in STAT_COLS)}) AS s(stat, value)
+	WHERE s.value > 0
+	GROUP BY 1, 2, 3
+"""
+
+
+class StatSketches:
+	def __init__(self, flush_interval=None):
+		self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("SWG_SKETCH_FLUSH", "60"))
+		# server_id -> {(class_id, stat): int32 counts indexed by value}
+		self._servers = {}
+		self._dirty = set()
+		self._last_flush = time.monotonic()
+
+	def _histograms(self, server_id):
+		histograms = self._servers.get(server_id)
+		if histograms is not None:
+			return histograms
+
+		histograms = {}
+		with DatabaseContext.cursor() as cur:
+			cur.execute("SELECT class_id, stat, counts FROM resource_stat_sketch WHERE server_id = %s", (server_id,))
+			for row in cur.fetchall():
+				histograms[(row['class_id'], row['stat'])] = np.array(row['counts'], dtype=np.int32)
+			if not histograms:
+				cur.execute(_BOOTSTRAP, (server_id, server_id))
+				for row in cur.fetchall():
+					key = (row['class_id'], row['stat'])
+					if key not in histograms:
+						histograms[key] = np.zeros(MAX_VALUE + 1, dtype=np.int32)
+					histograms[key][min(row['value'], MAX_VALUE)] += row['n']
+				self._dirty.update((server_id, key) for key in histograms)
+		self._servers[server_id] = histograms
+		return histograms
+
+	def percentiles(self, server_id, class_id, data):
+		"""{stat}_pct for every stat set in data, as if this spawn were already counted."""
+		histograms = self._histograms(server_id)
+		result = {}
+		for stat in STAT_COLS:
+			value = data.get(stat)
+			if value in (None, "") or int(value) <= 0:
+				continue
+			value = min(int(value), MAX_VALUE)
+			counts = histograms.get((int(class_id), stat))
+			if counts is None:
+				result[f"{stat}_pct"] = 50.0
+				continue
+			below = int(counts[:value].sum())
+			ties = int(counts[value]) + 1
+			total = int(counts.sum()) + 1
+			result[f"{stat}_pct"] = round(100.0 * (below + ties / 2) / total, 1)
+		return result
+
+	def observe(self, server_id, class_id, data):
+		"""Counts a newly added spawn's stats."""
+		histograms = self._histograms(server_id)
+		for stat in STAT_COLS:
+			value = data.get(stat)
+			if value in (None, "") or int(value) <= 0:
+				continue
+			key = (int(class_id), stat)
+			counts = histograms.get(key)
+			if counts is None:
+				counts = histograms[key] = np.zeros(MAX_VALUE + 1, dtype=np.int32)
+			counts[min(int(value), MAX_VALUE)] += 1
+			self._dirty.add((server_id, key))
+
+	def flush(self, force=False):
+		"""Writes changed histograms back once flush_interval has passed (or now, if forced)."""
+		if not self._dirty or (not force and time.monotonic() - self._last_flush < self.flush_interval):
+			return 0
+		dirty, self._dirty = self._dirty, set()
+		rows = [
+			(server_id, class_id, stat, self._servers[server_id][(class_id, stat)].tolist())
+			for server_id, (class_id, stat) in dirty
+		]
+		try:
+			with DatabaseContext.cursor(commit=True) as cur:
+				execute_values(cur, """
+					INSERT INTO resource_stat_sketch (server_id, class_id, stat, counts) VALUES %s
+					ON CONFLICT (server_id, class_id, stat) DO UPDATE SET counts = EXCLUDED.counts, updated_at = now()
+				""", rows)
+		except Exception:
+			# Keep them for the next attempt
+			self._dirty |= dirty
+			raise
+		finally:
+			self._last_flush = time.monotonic()
+		return len(rows)
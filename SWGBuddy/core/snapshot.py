@@ -0,0 +1,371 @@
+"""
+SWGBuddy Snapshot Module
+
+In-memory copy of each server's active spawns, kept by the Web process so the resource
+log polls are answered without touching Postgres.
+
+Versions are the database change sequence (resource_spawns.change_seq, see
+core/schema.py), so a client cursor means the same thing in every process and across
+restarts. Each snapshot keeps a bounded change log of (seq, spawn id). The Validation
+workers publish the ids they touched (SPAWNS_EVENT) inside their write transaction; the
+web process re-reads just those rows once the notification arrives and logs them under
+their new seq. A poll with since_seq is then a walk over the tail of the log, and the
+common no-change poll is one comparison.
+
+A snapshot is loaded from the database on first use. After a listener reconnect (RESYNC)
+it catches up with an index range scan on change_seq, and every SWG_SNAPSHOT_MAX_AGE
+seconds it is fully reloaded and diffed as a safety net. Retirements are recorded in
+resource_tombstones on the same sequence, so a cursor older than the in-memory log (its
+floor, e.g. from before a restart) is still answered as a delta: upserts are the records
+with a newer seq, removals come from the tombstones.
+
+Each server's writes are made by the one Validation worker that owns its shard, one
+transaction at a time, so within a server change_seq order is commit order and "every
+row with change_seq > N" is exactly what a client at N has not seen. Writes from outside
+the worker (python -m core.recompute) can commit seqs below ones already seen; a reload
+that finds such rows raises the snapshot's horizon, so every client then gets a full list.
+
+"""
+import os
+import threading
+import time
+
+from core.database import DatabaseContext
+from core import notify
+
+SPAWNS_EVENT = "spawns"
+
+# ids per notification; NOTIFY payloads are limited to 8000 bytes
+_IDS_PER_EVENT = 500
+
+# Rows per round-trip when (re)loading a snapshot
+_LOAD_BATCH = 2000
+
+_TOMBSTONES = """
+	SELECT spawn_id, change_seq FROM resource_tombstones
+	WHERE server_id = %s AND change_seq > %s
+"""
+
+_SELECT = """
+	SELECT rs.*,
+		   rt.class_label as type,
+		   u.username as reporter_name,
+		   EXTRACT(EPOCH FROM rs.date_reported) as date_reported_ts,
+		   EXTRACT(EPOCH FROM rs.last_modified) as last_modified_ts
+	FROM resource_spawns rs
+	JOIN resource_taxonomy rt ON rs.resource_class_id = rt.id
+	LEFT JOIN users u ON rs.reporter_id = u.discord_id
+	WHERE rs.server_id = %s
+"""
+
+
+def publish_spawn_changes(cur, server_id, ids=None, removed=None):
+	"""
+	Announces changed spawn ids on COMMIT: ids added or updated, removed as (id, change_seq)
+	pairs. With neither, asks for a full reload of server_id (every server if None).
+	"""
+	if ids is None and removed is None:
+		notify.publish(cur, SPAWNS_EVENT, server_id=server_id, ids=None)
+		return
+	if removed:
+		notify.publish(cur, SPAWNS_EVENT, server_id=server_id, ids=[], removed=[list(r) for r in removed])
+	ids = list(ids or [])
+	for start in range(0, len(ids), _IDS_PER_EVENT):
+		notify.publish(cur, SPAWNS_EVENT, server_id=server_id, ids=ids[start:start + _IDS_PER_EVENT])
+
+
+class SpawnRecord:
+	"""One spawn row. values line up with the owning snapshot's columns."""
+	__slots__ = ("id", "class_id", "seq", "changed_ts", "values")
+
+	def __init__(self, columns, row):
+		self.id = row['id']
+		self.class_id = row['resource_class_id']
+		self.seq = row['change_seq']
+		self.changed_ts = max(row.get('date_reported_ts') or 0, row.get('last_modified_ts') or 0)
+		self.values = tuple(row[c] for c in columns)
+
+
+class ServerSnapshot:
+	def __init__(self, server_id, log_size):
+		self.server_id = server_id
+		# Highest change_seq applied
+		self.version = 0
+		# Oldest cursor the in-memory log can answer; older ones also read the tombstones
+		self.floor = 0
+		# Cursors below this missed a deletion that left no tombstone and need a full list
+		self.horizon = 0
+		self.columns = ()
+		self.records = {}
+		self.log = []
+		self.log_size = log_size
+		self.loaded_at = None
+		self.lock = threading.RLock()
+
+	def _fetch(self, ids=None, since_seq=None):
+		sql, params = _SELECT, [self.server_id]
+		if ids is not None:
+			sql += " AND rs.id = ANY(%s)"
+			params.append(list(ids))
+		if since_seq is not None:
+			# Sargable: range scan on resource_spawns_server_seq_idx
+			sql += " AND rs.change_seq > %s"
+			params.append(since_seq)
+		with DatabaseContext.cursor() as cur:
+			cur.execute(sql, params)
+			rows = cur.fetchall()
+			columns = tuple(d[0] for d in cur.description)
+		return columns, rows
+
+	def _log(self, entries):
+		"""Appends (seq, spawn id) entries and advances the version."""
+		if not entries:
+			return
+		entries.sort()
+		if entries[0][0] <= self.version:
+			# A change never applied yet with a seq below the version: committed out of seq
+			# order (another writer, e.g. core.recompute). Keep the log sorted, and since
+			# cursors at or past those seqs have skipped them, they get a full list
+			self.log.extend(entries)
+			self.log.sort()
+			self.version = max(self.version, entries[-1][0])
+			self.horizon = self.version
+		else:
+			self.log.extend(entries)
+			self.version = entries[-1][0]
+		if len(self.log) > self.log_size:
+			drop = len(self.log) - self.log_size
+			self.floor = max(self.floor, self.log[drop - 1][0])
+			del self.log[:drop]
+
+	def _tombstones(self, since_seq, until_seq=None):
+		"""(spawn id, seq) retired after since_seq (and up to until_seq)."""
+		sql, params = _TOMBSTONES, [self.server_id, since_seq]
+		if until_seq is not None:
+			sql += " AND change_seq <= %s"
+			params.append(until_seq)
+		with DatabaseContext.cursor() as cur:
+			cur.execute(sql, params)
+			return [(row['spawn_id'], row['change_seq']) for row in cur.fetchall()]
+
+	def _upsert(self, columns, rows):
+		entries = []
+		for row in rows:
+			record = SpawnRecord(columns, row)
+			current = self.records.get(record.id)
+			# Already applied (a repeated notification, or a reload got there first)
+			if current is not None and current.seq >= record.seq:
+				continue
+			self.records[record.id] = record
+			entries.append((record.seq, record.id))
+		return entries
+
+	def _remove(self, removed):
+		# Logged even when the record is already gone, so the removal still reaches clients,
+		# unless its seq is not past the version: then it was applied already
+		entries = []
+		for spawn_id, seq in removed:
+			if self.records.pop(spawn_id, None) is not None or seq > self.version:
+				entries.append((seq, spawn_id))
+		return entries
+
+	def load(self):
+		"""Full reload from the database, logging every difference from the previous copy."""
+		with self.lock:
+			# Server-side cursor: rows become records a batch at a time, never all at once
+			columns, records = None, {}
+			with DatabaseContext.server_cursor(itersize=_LOAD_BATCH) as cur:
+				cur.execute(_SELECT, (self.server_id,))
+				for row in cur:
+					if columns is None:
+						columns = tuple(d[0] for d in cur.description)
+					record = SpawnRecord(columns, row)
+					records[record.id] = record
+				if columns is None:
+					columns = tuple(d[0] for d in cur.description or ())
+			max_seq = max((r.seq for r in records.values()), default=0)
+
+			if self.loaded_at is None or columns != self.columns:
+				# First load (or the row shape changed): nothing to diff against. Older cursors
+				# are answered from the records' seqs and the tombstones.
+				retired = self._tombstones(self.version)
+				self.columns, self.records = columns, records
+				self.version = self.floor = max([self.version, max_seq] + [seq for _, seq in retired])
+			else:
+				old, since_seq = self.records, self.version
+				self.columns, self.records = columns, records
+				entries = [(r.seq, i) for i, r in records.items() if i not in old or old[i].values != r.values]
+				gone = [i for i in old if i not in records]
+				retired = dict(self._tombstones(since_seq)) if gone else {}
+				entries.extend((retired[i], i) for i in gone if i in retired)
+				self._log(entries)
+				if any(i not in retired for i in gone):
+					# Deleted without a tombstone (by hand?): older cursors need a full list
+					self.horizon = self.version
+			self.loaded_at = time.monotonic()
+
+	def catch_up(self):
+		"""Applies every row changed and every spawn retired after the current version (index range scans)."""
+		with self.lock:
+			if self.loaded_at is None:
+				return self.load()
+			since_seq = self.version
+			columns, rows = self._fetch(since_seq=since_seq)
+			if columns != self.columns and rows:
+				return self.load()
+			self._log(self._upsert(columns, rows) + self._remove(self._tombstones(since_seq)))
+
+	def refresh(self, ids, removed=()):
+		"""Re-reads the given ids and applies (id, seq) removals."""
+		with self.lock:
+			if self.loaded_at is None:
+				return self.load()
+			entries = self._remove(removed)
+			if ids:
+				columns, rows = self._fetch(ids)
+				if columns != self.columns:
+					return self.load()
+				entries += self._upsert(columns, rows)
+				found = {row['id'] for row in rows}
+				for spawn_id in ids:
+					# Retired in the meantime: its tombstone notification follows
+					if spawn_id not in found:
+						self.records.pop(spawn_id, None)
+			self._log(entries)
+
+	def changes_since(self, since_seq, version=None):
+		"""
+		Returns (records, removed ids) changed after since_seq up to version (default: the
+		current one), or None when only a full list is correct: since_seq is ahead of the
+		snapshot (the database was recreated) or behind an untracked deletion.
+		Database errors propagate.
+		"""
+		with self.lock:
+			version = self.version if version is None else version
+			if since_seq > version or since_seq < self.horizon:
+				return None
+			if since_seq == version:
+				return [], []
+
+			if since_seq >= self.floor:
+				ids = set()
+				for seq, spawn_id in reversed(self.log):
+					if seq <= since_seq:
+						break
+					ids.add(spawn_id)
+				records = [self.records[i] for i in ids if i in self.records]
+				removed = [i for i in ids if i not in self.records]
+				return records, removed
+
+			# Older than the log: every record carries its latest seq, removals are tombstones
+			records = [r for r in self.records.values() if r.seq > since_seq]
+		removed = [spawn_id for spawn_id, _ in self._tombstones(since_seq, version)]
+		with self.lock:
+			removed = [i for i in removed if i not in self.records]
+		return records, removed
+
+	def retired_since(self, ts):
+		"""Spawn ids retired after the epoch timestamp ts, for legacy 'since' polling."""
+		with DatabaseContext.cursor() as cur:
+			cur.execute(
+				"SELECT spawn_id FROM resource_tombstones WHERE server_id = %s AND retired_at > to_timestamp(%s)",
+				(self.server_id, ts)
+			)
+			removed = [row['spawn_id'] for row in cur.fetchall()]
+		with self.lock:
+			return [i for i in removed if i not in self.records]
+
+	def all_records(self):
+		with self.lock:
+			return list(self.records.values())
+
+	def to_dict(self, record):
+		return dict(zip(self.columns, record.values))
+
+
+class SnapshotStore:
+	"""Lazily loaded ServerSnapshot per server_id."""
+
+	def __init__(self, max_age=None, log_size=None):
+		self.max_age = max_age if max_age is not None else float(os.getenv("SWG_SNAPSHOT_MAX_AGE", "600"))
+		self.log_size = log_size if log_size is not None else int(os.getenv("SWG_SNAPSHOT_LOG", "20000"))
+		self._servers = {}
+		self._lock = threading.Lock()
+		self._watchers = []
+
+	def attach(self, listener):
+		"""Subscribes the store to the validation workers' change notifications."""
+		listener.subscribe(SPAWNS_EVENT, self._on_event)
+		listener.subscribe(notify.RESYNC, lambda data: self.catch_up())
+
+	def watch(self, callback):
+		"""Registers callback(server_id) to run after a snapshot changed (server_id None: any)."""
+		self._watchers.append(callback)
+
+	def _changed(self, server_id):
+		for callback in self._watchers:
+			callback(server_id)
+
+	def get(self, server_id):
+		"""Returns the loaded snapshot for server_id. Database errors propagate."""
+		with self._lock:
+			snapshot = self._servers.get(server_id)
+			if snapshot is None:
+				snapshot = self._servers[server_id] = ServerSnapshot(server_id, self.log_size)
+
+		loaded_at = snapshot.loaded_at
+		if loaded_at is None or time.monotonic() - loaded_at > self.max_age:
+			with snapshot.lock:
+				# Another request may have reloaded it while we waited
+				if snapshot.loaded_at == loaded_at:
+					snapshot.load()
+		return snapshot
+
+	def invalidate(self, server_id=None):
+		"""Marks snapshots stale; the next get() reloads (and diffs) them."""
+		with self._lock:
+			snapshots = list(self._servers.values()) if server_id is None else [self._servers.get(server_id)]
+		for snapshot in snapshots:
+			if snapshot is not None and snapshot.loaded_at is not None:
+				snapshot.loaded_at = float("-inf")
+
+	def catch_up(self):
+		"""After missed notifications: pull whatever changed since each snapshot's version."""
+		with self._lock:
+			snapshots = list(self._servers.values())
+		try:
+			for snapshot in snapshots:
+				try:
+					snapshot.catch_up()
+				except Exception:
+					self.invalidate(snapshot.server_id)
+					raise
+		finally:
+			self._changed(None)
+
+	def _on_event(self, data):
+		server_id, ids = data.get('server_id'), data.get('ids')
+		if ids is None:
+			self.invalidate(server_id)
+			return self._changed(server_id)
+
+		snapshot = self._servers.get(server_id)
+		# Nothing cached for that server yet: its first get() loads current rows anyway.
+		# A load in progress holds the snapshot lock, so the refresh runs after it.
+		if snapshot is None:
+			return
+		try:
+			snapshot.refresh(ids, data.get('removed') or ())
+		except Exception:
+			self.invalidate(server_id)
+			raise
+		finally:
+			self._changed(server_id)
+
+	def stats(self):
+		with self._lock:
+			snapshots = list(self._servers.values())
+		return {
+			s.server_id: {"records": len(s.records), "version": s.version, "floor": s.floor, "horizon": s.horizon, "log": len(s.log)}
+			for s in snapshots
+		}
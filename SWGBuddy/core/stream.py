@@ -0,0 +1,206 @@
+"""
+SWGBuddy Stream Module
+
+Server-Sent Events push channel for spawn changes (GET /api/stream).
+
+Runs its own asyncio HTTP server on a separate port (SWG_STREAM_PORT) inside the Web
+process, so an idle subscriber costs a socket and a coroutine instead of a waitress
+thread. Connections sleep on a per-server asyncio.Event that the SnapshotStore wakes
+after it has applied a change notification; each wake sends what changed since the
+client's change_seq as one "changes" event, with the new seq as the event id. Browsers
+resend it as Last-Event-ID when they reconnect, so a dropped connection resumes where it
+stopped. Idle connections get a comment line every SWG_STREAM_HEARTBEAT seconds to keep
+proxies from timing them out.
+
+The server speaks plain HTTP, so it must sit behind the same TLS proxy as the app
+(otherwise an HTTPS page cannot reach it and the Secure session cookie is never sent).
+SWG_STREAM_URL is the public URL the proxy forwards to the port, e.g.
+https://swgbuddy.example/api/stream; the stream is off while it is unset. It binds
+SWG_STREAM_HOST (default 127.0.0.1), for a proxy on the same machine.
+
+Events:
+	changes: {"resources": [...], "removed": [ids], "next_seq": N}
+	resync:  the cursor cannot be served as a delta; reload in full, then reconnect
+
+"""
+import asyncio
+import logging
+import os
+import threading
+import urllib.parse
+
+# Request line plus headers; anything larger is not an EventSource request
+_MAX_HEADER_BYTES = 16384
+
+# The app's own (see server.set_security_headers); Flask does not see these responses
+_SECURITY_HEADERS = (
+	"X-Content-Type-Options: nosniff\r\n"
+	"X-Frame-Options: SAMEORIGIN\r\n"
+	"Strict-Transport-Security: max-age=31536000; includeSubDomains\r\n"
+)
+
+
+class ChangeStream:
+	def __init__(self, store, authenticate, encode, url=None, port=None, host=None, heartbeat=None, max_clients=None, origins=None):
+		"""
+		store: SnapshotStore. authenticate(cookie_header) returns the session dict or None.
+		encode(obj) returns the JSON text for an event payload.
+		"""
+		self.store = store
+		self.authenticate = authenticate
+		self.encode = encode
+		self.url = url if url is not None else os.getenv("SWG_STREAM_URL", "")
+		self.port = port if port is not None else int(os.getenv("SWG_STREAM_PORT", "5001"))
+		self.host = host if host is not None else os.getenv("SWG_STREAM_HOST", "127.0.0.1")
+		self.heartbeat = heartbeat if heartbeat is not None else float(os.getenv("SWG_STREAM_HEARTBEAT", "15"))
+		self.max_clients = max_clients if max_clients is not None else int(os.getenv("SWG_STREAM_MAX_CLIENTS", "1000"))
+		# Allowed Origins for the cross-port request; empty: any origin on the same host
+		if origins is None:
+			origins = [o.strip() for o in os.getenv("SWG_STREAM_ORIGINS", "").split(",") if o.strip()]
+		self.origins = set(origins)
+
+		self.clients = 0
+		self.loop = None
+		self._events = {}
+		self._thread = None
+
+	def start(self):
+		"""Starts the server thread and subscribes to the store. Off without a public URL or port."""
+		if not self.url or not self.port or (self._thread and self._thread.is_alive()):
+			return
+		self.store.watch(self.notify)
+		self._thread = threading.Thread(target=self._run, name="ChangeStream", daemon=True)
+		self._thread.start()
+
+	def _run(self):
+		self.loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.loop)
+		try:
+			server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+			logging.info(f"[Stream] Serving /api/stream on {self.host}:{self.port} as {self.url}")
+			self.loop.run_until_complete(server.serve_forever())
+		except Exception as e:
+			logging.error(f"[Stream] Server stopped: {e}")
+
+	def notify(self, server_id):
+		"""Called from the listener thread once a snapshot changed (server_id None: all)."""
+		if self.loop is not None:
+			self.loop.call_soon_threadsafe(self._wake, server_id)
+
+	def _wake(self, server_id):
+		keys = list(self._events) if server_id is None else [server_id]
+		for key in keys:
+			event = self._events.pop(key, None)
+			if event is not None:
+				event.set()
+
+	def _event_for(self, server_id):
+		# One Event per server and generation: setting it wakes every subscriber at once
+		event = self._events.get(server_id)
+		if event is None:
+			event = self._events[server_id] = asyncio.Event()
+		return event
+
+	def stats(self):
+		return {"clients": self.clients, "url": self.url, "port": self.port}
+
+	async def _read_request(self, reader):
+		head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+		if len(head) > _MAX_HEADER_BYTES:
+			raise ValueError("request too large")
+		lines = head.decode("latin-1").split("\r\n")
+		method, target, _ = lines[0].split(" ", 2)
+		headers = {}
+		for line in lines[1:]:
+			name, sep, value = line.partition(":")
+			if sep:
+				headers[name.strip().lower()] = value.strip()
+		url = urllib.parse.urlsplit(target)
+		return method, url.path, dict(urllib.parse.parse_qsl(url.query)), headers
+
+	def _cors_headers(self, headers):
+		origin = headers.get('origin')
+		if not origin:
+			return ""
+		host = (headers.get('host') or "").rsplit(":", 1)[0]
+		allowed = origin in self.origins if self.origins else urllib.parse.urlsplit(origin).hostname == host
+		if not allowed:
+			return ""
+		return f"Access-Control-Allow-Origin: {origin}\r\nAccess-Control-Allow-Credentials: true\r\nVary: Origin\r\n"
+
+	async def _reply(self, writer, status, body=""):
+		data = body.encode("utf-8")
+		writer.write(
+			f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\nContent-Length: {len(data)}\r\n"
+			f"{_SECURITY_HEADERS}Connection: close\r\n\r\n".encode("latin-1") + data
+		)
+		await writer.drain()
+
+	async def _send(self, writer, event, data, event_id=None):
+		lines = [f"event: {event}"]
+		if event_id is not None:
+			lines.append(f"id: {event_id}")
+		lines.append(f"data: {self.encode(data)}")
+		writer.write(("\n".join(lines) + "\n\n").encode("utf-8"))
+		await writer.drain()
+
+	async def _handle(self, reader, writer):
+		self.clients += 1
+		try:
+			try:
+				method, path, params, headers = await self._read_request(reader)
+			except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+				return
+
+			if method != "GET" or path != "/api/stream":
+				return await self._reply(writer, "404 Not Found")
+			if self.clients > self.max_clients:
+				return await self._reply(writer, "503 Service Unavailable", "Too many streams")
+			if self.authenticate(headers.get('cookie', "")) is None:
+				return await self._reply(writer, "401 Unauthorized")
+
+			server_id = params.get('server', 'cuemu')
+			cursor = headers.get('last-event-id') or params.get('since_seq')
+			since_seq = int(cursor) if cursor and cursor.isdigit() else None
+
+			writer.write((
+				"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+				"X-Accel-Buffering: no\r\nConnection: keep-alive\r\n" + _SECURITY_HEADERS + self._cors_headers(headers) + "\r\n"
+				"retry: 5000\n\n"
+			).encode("utf-8"))
+			await writer.drain()
+			await self._stream(writer, server_id, since_seq)
+		except (ConnectionError, asyncio.CancelledError):
+			pass
+		except Exception as e:
+			logging.error(f"[Stream] Connection failed: {e}")
+		finally:
+			self.clients -= 1
+			writer.close()
+
+	async def _stream(self, writer, server_id, since_seq):
+		loop = asyncio.get_running_loop()
+		while True:
+			# Taken before reading the snapshot, so a change landing in between still wakes us
+			event = self._event_for(server_id)
+			snapshot = await loop.run_in_executor(None, self.store.get, server_id)
+			version = snapshot.version
+			if since_seq is None:
+				since_seq = version
+			elif since_seq != version:
+				delta = await loop.run_in_executor(None, snapshot.changes_since, since_seq, version)
+				if delta is None:
+					return await self._send(writer, "resync", {"next_seq": version})
+				records, removed = delta
+				await self._send(writer, "changes", {
+					"resources": [snapshot.to_dict(r) for r in records],
+					"removed": removed,
+					"next_seq": version
+				}, event_id=version)
+				since_seq = version
+
+			try:
+				await asyncio.wait_for(event.wait(), timeout=self.heartbeat)
+			except asyncio.TimeoutError:
+				writer.write(b": ping\n\n")
+				await writer.drain()
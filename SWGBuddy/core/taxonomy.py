@@ -0,0 +1,377 @@
+"""
+SWGBuddy Taxonomy Module
+
+Loads assets/resource_taxonomy.json and compiles it into per-type validator objects.
+
+The JSON tree is walked once at load time. Each spawnable type becomes a ResourceValidator
+holding everything a write needs as flat tuples (stat bounds, allowed planets), so
+validating and rating a packet is a single pass with no dict-of-dict lookups.
+
+The flattened tree (CompiledTaxonomy) is also cached next to the JSON as
+assets/resource_taxonomy.bin: a pickle (protocol 5) whose NumPy arrays are stored
+out-of-band and mapped straight from the file, so every process shares the same pages.
+The artifact records the sha256 of the JSON it was built from; load_taxonomy() falls
+back to the JSON (and rewrites the artifact) whenever the two disagree.
+
+Category queries use a subtree index: for every node, the ids of its subtree as a short
+list of [lo, hi] intervals. Gaps that no taxonomy id falls into are bridged, so most
+subtrees are one interval and "all Metals" becomes resource_class_id BETWEEN lo AND hi.
+
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+
+import numpy as np
+
+# Maps JSON keys to DB Columns (column order of every stat array in this module)
+STAT_COLS = (
+	"res_oq", "res_cd", "res_dr", "res_fl", "res_hr",
+	"res_ma", "res_pe", "res_sr", "res_ut", "res_cr"
+)
+RATING_COLS = tuple(f"{stat}_rating" for stat in STAT_COLS)
+# Percentile of each stat within its class's history (see core.sketch)
+PCT_COLS = tuple(f"{stat}_pct" for stat in STAT_COLS)
+
+# HARDENING 1: Name Validation (Regex: Alphanumeric, spaces, parens, hyphens)
+NAME_RE = re.compile(r'^[a-zA-Z0-9\s\-\(\)\.]+$')
+# HARDENING 2: Simple tag stripping since we don't have bleach
+TAG_RE = re.compile(r'<[^>]*>')
+
+NAME_MAX_LEN = 100
+
+# Broadcast (core.notify) when a process reloads the taxonomy
+TAXONOMY_EVENT = "taxonomy"
+
+
+ARTIFACT_MAGIC = b"SWGTAX02"
+# magic, pickle length, out-of-band buffer count
+_ARTIFACT_HEADER = struct.Struct("!8sQI")
+# offset, length of one buffer
+_ARTIFACT_BUFFER = struct.Struct("!QQ")
+# Buffers start on cache line boundaries
+_ARTIFACT_ALIGN = 64
+
+
+def taxonomy_path(base_dir=None):
+	base_dir = base_dir or os.getcwd()
+	return os.path.join(base_dir, "assets", "resource_taxonomy.json")
+
+
+def artifact_path(base_dir=None):
+	base_dir = base_dir or os.getcwd()
+	return os.path.join(base_dir, "assets", "resource_taxonomy.bin")
+
+
+def load_tree(path=None):
+	with open(path or taxonomy_path(), 'r') as f:
+		return json.load(f)
+
+
+def iter_nodes(tree):
+	"""Depth-first (pre-order) walk over every node of the tree, without recursion."""
+	stack = list(reversed(tree))
+	while stack:
+		node = stack.pop()
+		yield node
+		stack.extend(reversed(node.get('children') or []))
+
+
+class ResourceValidator:
+	"""Compiled rules for one spawnable resource type."""
+	__slots__ = ("label", "class_id", "stat_index", "bounds", "planets", "planet_list")
+
+	def __init__(self, label, class_id, stats, planets):
+		self.label = label
+		self.class_id = class_id
+		# Indices into STAT_COLS that apply to this type
+		self.stat_index = tuple(i for i, stat in enumerate(STAT_COLS) if stat in stats)
+		# Per STAT_COLS position: (min, max) or None when the stat does not apply
+		self.bounds = tuple(
+			(stats[stat]['min'], stats[stat]['max']) if stat in stats else None
+			for stat in STAT_COLS
+		)
+		self.planet_list = tuple(planets)
+		self.planets = frozenset(planets)
+
+	def _check_planet(self, planet):
+		if planet not in self.planets:
+			raise ValueError(f"Planet '{planet}' is not valid for this resource type.")
+
+	def validate(self, data):
+		"""
+		Validates and normalizes a write payload in place, then stores the *_rating columns
+		and res_weight_rating. Raises ValueError on the first violation.
+		"""
+		name = " ".join(str(data.get('name') or '').split())
+		if not name:
+			raise ValueError("Resource name is required.")
+		if not NAME_RE.match(name):
+			raise ValueError("Invalid characters in Resource Name.")
+		if len(name) > NAME_MAX_LEN:
+			raise ValueError("Name too long.")
+		data['name'] = name
+
+		notes = data.get('notes', '')
+		if notes:
+			data['notes'] = TAG_RE.sub('', notes)
+
+		# Planet Validation
+		planet_input = data.get('planet')
+		if planet_input:
+			if isinstance(planet_input, list):
+				clean_list = [str(p).capitalize() for p in planet_input]
+				data['planet'] = clean_list
+				for p in clean_list:
+					self._check_planet(p)
+			else:
+				planet_str = str(planet_input).capitalize()
+				data['planet'] = planet_str
+				self._check_planet(planet_str)
+
+		# Stat Validation + Ratings, one pass
+		rating_sum = 0.0
+		rating_count = 0
+		for i, stat in enumerate(STAT_COLS):
+			val = data.get(stat)
+			if val is None or val == "": continue
+			try:
+				val = int(val)
+			except (TypeError, ValueError):
+				raise ValueError(f"{stat} must be an integer")
+
+			bound = self.bounds[i]
+			if bound is None:
+				if val > 0: raise ValueError(f"{stat} is not applicable for this resource.")
+				continue
+
+			mn, mx = bound
+			if not (mn <= val <= mx):
+				raise ValueError(f"{stat} value {val} is out of range ({mn}-{mx}).")
+			if val == 0: continue
+
+			# Divide rather than multiply by a cached 1/max: the product rounds differently
+			# on some .0005 boundaries and would change stored ratings
+			rating = round(val / mx, 3) if mx > 0 else 0.0
+			data[RATING_COLS[i]] = rating
+			rating_sum += rating
+			rating_count += 1
+
+		data['res_weight_rating'] = round(rating_sum / rating_count, 3) if rating_count else 0.0
+		return self
+
+
+def compile_validators(tree):
+	"""label -> ResourceValidator for every spawnable (is_valid) node."""
+	validators = {}
+	for node in iter_nodes(tree):
+		if node.get('is_valid'):
+			validators[node['label']] = ResourceValidator(
+				node['label'], node['id'], node.get('stats', {}), node.get('planets', [])
+			)
+	return validators
+
+
+class CompiledTaxonomy:
+	"""
+	The whole tree as flat, pre-order arrays (node i's descendants are i+1 .. subtree_end[i]-1).
+
+	stat_min / stat_max are (nodes x STAT_COLS) int32 matrices, -1 where the stat does not
+	apply. Node i's subtree id intervals are range_lo/range_hi[range_offsets[i]:range_offsets[i+1]].
+	These arrays are read-only views into the artifact when loaded from disk.
+	"""
+	FIELDS = (
+		"source_sha256", "ids", "labels", "parent", "subtree_end", "valid", "stat_min", "stat_max", "planets",
+		"range_offsets", "range_lo", "range_hi"
+	)
+
+	def __init__(self, source_sha256, ids, labels, parent, subtree_end, valid, stat_min, stat_max, planets,
+			range_offsets, range_lo, range_hi):
+		self.source_sha256 = source_sha256
+		self.ids = ids
+		self.labels = labels
+		self.parent = parent
+		self.subtree_end = subtree_end
+		self.valid = valid
+		self.stat_min = stat_min
+		self.stat_max = stat_max
+		self.planets = planets
+		self.range_offsets = range_offsets
+		self.range_lo = range_lo
+		self.range_hi = range_hi
+		self.index_by_label = {label: i for i, label in enumerate(labels)}
+		self.index_by_id = {int(node_id): i for i, node_id in enumerate(ids)}
+		self._index_by_folded = {label.casefold(): i for i, label in enumerate(labels)}
+
+	def __len__(self):
+		return len(self.labels)
+
+	@classmethod
+	def from_tree(cls, tree, source_sha256=None):
+		ids, labels, parent, subtree_end, valid, planets = [], [], [], [], [], []
+		stat_min, stat_max = [], []
+
+		# Pre-order walk that also closes each subtree once its last descendant is placed
+		stack = [(node, -1, False) for node in reversed(tree)]
+		while stack:
+			node, parent_index, closing = stack.pop()
+			if closing:
+				subtree_end[parent_index] = len(labels)
+				continue
+
+			index = len(labels)
+			ids.append(int(node['id']))
+			labels.append(node['label'])
+			parent.append(parent_index)
+			subtree_end.append(index + 1)
+			valid.append(bool(node.get('is_valid')))
+			planets.append(tuple(node.get('planets') or ()))
+			stats = node.get('stats') or {}
+			stat_min.append([stats[stat]['min'] if stat in stats else -1 for stat in STAT_COLS])
+			stat_max.append([stats[stat]['max'] if stat in stats else -1 for stat in STAT_COLS])
+
+			stack.append((None, index, True))
+			stack.extend((child, index, False) for child in reversed(node.get('children') or []))
+
+		ids = np.array(ids, dtype=np.int32)
+		subtree_end = np.array(subtree_end, dtype=np.int32)
+		return cls(
+			source_sha256,
+			ids,
+			labels,
+			np.array(parent, dtype=np.int32),
+			subtree_end,
+			np.array(valid, dtype=np.bool_),
+			np.array(stat_min, dtype=np.int32).reshape(-1, len(STAT_COLS)),
+			np.array(stat_max, dtype=np.int32).reshape(-1, len(STAT_COLS)),
+			planets,
+			*_subtree_id_ranges(ids, subtree_end)
+		)
+
+	def find(self, category):
+		"""Node index for an id or a label (case-insensitive), or None."""
+		category = str(category).strip()
+		if category.isdigit():
+			return self.index_by_id.get(int(category))
+		index = self.index_by_label.get(category)
+		return index if index is not None else self._index_by_folded.get(category.casefold())
+
+	def subtree_ranges(self, index):
+		"""[(lo, hi), ...] inclusive resource_class_id intervals covering node `index` and its descendants."""
+		start, end = self.range_offsets[index], self.range_offsets[index + 1]
+		return list(zip(self.range_lo[start:end].tolist(), self.range_hi[start:end].tolist()))
+
+	def validators(self):
+		"""label -> ResourceValidator, same as compile_validators() on the source tree."""
+		validators = {}
+		# One conversion per array; indexing NumPy element by element is slower than the JSON path
+		ids, mins, maxs = self.ids.tolist(), self.stat_min.tolist(), self.stat_max.tolist()
+		for i in np.flatnonzero(self.valid).tolist():
+			stats = {
+				stat: {'min': mins[i][j], 'max': maxs[i][j]}
+				for j, stat in enumerate(STAT_COLS) if maxs[i][j] >= 0
+			}
+			validators[self.labels[i]] = ResourceValidator(self.labels[i], str(ids[i]), stats, self.planets[i])
+		return validators
+
+
+def _subtree_id_ranges(ids, subtree_end):
+	"""
+	Interval index over pre-order arrays. Works on ranks in the sorted id list, so ids that
+	belong to no node at all never split an interval.
+	Returns (range_offsets, range_lo, range_hi).
+	"""
+	sorted_ids = np.sort(ids)
+	rank = np.searchsorted(sorted_ids, ids)
+	offsets, lows, highs = [0], [], []
+	for i in range(len(ids)):
+		ranks = np.sort(rank[i:subtree_end[i]])
+		breaks = np.flatnonzero(np.diff(ranks) != 1) + 1
+		lows.append(sorted_ids[ranks[np.r_[0, breaks]]])
+		highs.append(sorted_ids[ranks[np.r_[breaks - 1, len(ranks) - 1]]])
+		offsets.append(offsets[-1] + len(lows[-1]))
+	return (
+		np.array(offsets, dtype=np.int32),
+		np.concatenate(lows).astype(np.int32),
+		np.concatenate(highs).astype(np.int32)
+	)
+
+
+def source_digest(raw):
+	return hashlib.sha256(raw).hexdigest()
+
+
+def write_artifact(taxonomy, path=None):
+	"""Writes the artifact atomically (temp file + rename), so readers never see a partial file."""
+	path = path or artifact_path()
+	buffers = []
+	body = pickle.dumps({f: getattr(taxonomy, f) for f in CompiledTaxonomy.FIELDS}, protocol=5, buffer_callback=buffers.append)
+	raws = [b.raw() for b in buffers]
+
+	def align(n):
+		return -(-n // _ARTIFACT_ALIGN) * _ARTIFACT_ALIGN
+
+	offset = align(_ARTIFACT_HEADER.size + _ARTIFACT_BUFFER.size * len(raws) + len(body))
+	entries = []
+	for raw in raws:
+		entries.append((offset, raw.nbytes))
+		offset = align(offset + raw.nbytes)
+
+	tmp = f"{path}.{os.getpid()}.tmp"
+	with open(tmp, 'wb') as f:
+		f.write(_ARTIFACT_HEADER.pack(ARTIFACT_MAGIC, len(body), len(raws)))
+		for entry in entries:
+			f.write(_ARTIFACT_BUFFER.pack(*entry))
+		f.write(body)
+		for (start, _), raw in zip(entries, raws):
+			f.write(b"\0" * (start - f.tell()))
+			f.write(raw)
+	os.replace(tmp, path)
+	return path
+
+
+def read_artifact(path=None):
+	"""Maps the artifact read-only; the arrays of the result are views into the mapping."""
+	with open(path or artifact_path(), 'rb') as f:
+		mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	magic, body_len, count = _ARTIFACT_HEADER.unpack_from(mapped)
+	if magic != ARTIFACT_MAGIC:
+		raise ValueError("Not a taxonomy artifact (or an incompatible version)")
+
+	view = memoryview(mapped)
+	entries = [_ARTIFACT_BUFFER.unpack_from(mapped, _ARTIFACT_HEADER.size + i * _ARTIFACT_BUFFER.size) for i in range(count)]
+	start = _ARTIFACT_HEADER.size + _ARTIFACT_BUFFER.size * count
+	state = pickle.loads(view[start:start + body_len], buffers=[view[o:o + n] for o, n in entries])
+	return CompiledTaxonomy(**state)
+
+
+def load_taxonomy(base_dir=None, log=None):
+	"""
+	Returns the CompiledTaxonomy for assets/resource_taxonomy.json: from the artifact when its
+	recorded hash matches the JSON, otherwise parsed from the JSON, refreshing the artifact.
+	"""
+	with open(taxonomy_path(base_dir), 'rb') as f:
+		raw = f.read()
+	digest = source_digest(raw)
+
+	try:
+		taxonomy = read_artifact(artifact_path(base_dir))
+		if taxonomy.source_sha256 == digest:
+			return taxonomy
+		if log: log("Taxonomy artifact is stale, rebuilding from JSON.")
+	except FileNotFoundError:
+		pass
+	except Exception as e:
+		if log: log(f"Taxonomy artifact unreadable ({e}), rebuilding from JSON.")
+
+	taxonomy = CompiledTaxonomy.from_tree(json.loads(raw), digest)
+	try:
+		write_artifact(taxonomy, artifact_path(base_dir))
+	except OSError as e:
+		if log: log(f"Could not write taxonomy artifact: {e}")
+	return taxonomy
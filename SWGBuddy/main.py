@@ -1,11 +1,21 @@
+import os
 import time
 import signal
 import sys
 import multiprocessing
+from core.codec import make_queue, MSG_LOG, MSG_COMMAND, MSG_REPLY
+from core.ipc import ShardRouter
 from services.logger import LogService
 from services.validation import ValidationService
 from services.web import WebService
 
+# Number of ValidationService workers. Packets are sharded by server_id.
+VALIDATION_WORKERS = max(1, int(os.getenv("SWG_VALIDATION_WORKERS", "2")))
+# Hard capacity of each validation queue and of the log queue (0 = unbounded)
+VALIDATION_QUEUE_MAX = int(os.getenv("SWG_VAL_QUEUE_MAX", "1000"))
+LOG_QUEUE_MAX = int(os.getenv("SWG_LOG_QUEUE_MAX", "10000"))
+# Seconds between queue depth reports from the monitor loop
+QUEUE_REPORT_INTERVAL = int(os.getenv("SWG_QUEUE_REPORT_INTERVAL", "30"))
 
 
 class ServiceManager:
@@ -13,21 +23,22 @@ class ServiceManager:
         self.running = True
         self.processes = []
         
-        # Shared Queues
-        self.log_queue = multiprocessing.Queue()
-        self.validation_queue = multiprocessing.Queue()
+        # Shared Queues (serializer selected by SWG_IPC_CODEC, see core.codec)
+        self.log_queue = make_queue(MSG_LOG, LOG_QUEUE_MAX)
+        # One bounded queue per validation worker (see ShardRouter)
+        self.validation_queues = [make_queue(MSG_COMMAND, VALIDATION_QUEUE_MAX) for _ in range(VALIDATION_WORKERS)]
         # FIX 1: Add the missing reply queue
-        self.reply_queue = multiprocessing.Queue()
+        # Left unbounded: a worker must never block on replying
+        self.reply_queue = make_queue(MSG_REPLY)
 
     def start(self):
         print("[Manager] Spawning Services...")
 
-        services = [
-            ("Logger", LogService, (self.log_queue,)),
-            # FIX 2: Pass reply_queue to Validation & Web
-            ("Validation", ValidationService, (self.validation_queue, self.log_queue, self.reply_queue)),
-            ("Web", WebService, (self.validation_queue, self.log_queue, self.reply_queue))
-        ]
+        services = [("Logger", LogService, (self.log_queue,))]
+        # FIX 2: Pass reply_queue to Validation & Web
+        for worker_id, queue in enumerate(self.validation_queues):
+            services.append((f"Validation-{worker_id}", ValidationService, (queue, self.log_queue, self.reply_queue, worker_id, VALIDATION_WORKERS)))
+        services.append(("Web", WebService, (self.validation_queues, self.log_queue, self.reply_queue)))
 
         for name, cls, args in services:
             # FIX 3: Use the static method (ServiceManager._wrapper) instead of self._wrapper
@@ -50,8 +61,16 @@ class ServiceManager:
             sys.exit(1)
 
     def _monitor(self):
+        router = ShardRouter(self.validation_queues)
+        last_report = time.time()
         while self.running:
             time.sleep(1)
+            # Periodic per-worker backlog report, used to size SWG_VALIDATION_WORKERS
+            if time.time() - last_report >= QUEUE_REPORT_INTERVAL:
+                last_report = time.time()
+                depths = router.depths()
+                if any(depths):
+                    print(f"[Manager] Validation queue depths: {depths}")
             # Optional: Check if processes are alive and restart them
             for p in self.processes:
                 if not p.is_alive():
@@ -3,15 +3,28 @@ import re
 import io
 import uuid
 import json
+import math
 import threading
 import time
 import requests
 import secrets
 import urllib.parse
-from queue import Queue, Empty
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, current_app, abort
+from werkzeug.http import parse_cookie
+from flask import Flask, Response, jsonify, request, render_template, redirect, url_for, session, current_app, abort
 from flask_cors import CORS
 from core.database import DatabaseContext
+from core.ipc import ReplyRouter, Overloaded
+from core.notify import RESYNC, NotificationListener
+from core.permissions import permission_cache
+from core.history import class_history
+from core.query import ResourceQuery
+from core.scoring import DEFAULT_TOP, ScoringEngine, parse_weights
+from core.jsonstream import gzip_chunks, iter_json_list
+from core.importer import detect_format, iter_chunks, iter_rows
+from core.precompressed import PrecompressedDocument
+from core.snapshot import SnapshotStore
+from core.stream import ChangeStream
+from core.taxonomy import STAT_COLS, TAXONOMY_EVENT, load_taxonomy, taxonomy_path
 
 from PIL import Image
 import pytesseract
@@ -61,59 +74,166 @@ def csrf_protect():
 # ... (Rest of existing router logic and endpoints) ...
 # (Keep response_router, start_response_router, send_command, and all routes unchanged below)
 
-response_futures = {} 
+reply_router = ReplyRouter()
 
 def start_response_router(reply_queue):
-	t = threading.Thread(target=_router_loop, args=(reply_queue,), daemon=True)
+	t = threading.Thread(target=reply_router.run, args=(reply_queue,), daemon=True)
 	t.start()
 
-def _router_loop(reply_queue):
-	while True:
-		try:
-			msg = reply_queue.get()
-			cid = msg.get('id')
-			if cid and cid in response_futures:
-				response_futures[cid].put(msg)
-		except Exception as e:
-			print(f"Router Error: {e}")
-			time.sleep(1)
+def _build_taxonomy_body():
+	# Compact re-encoding: the file on disk is indented for humans
+	with open(taxonomy_path(os.path.dirname(os.path.abspath(__file__))), 'rb') as f:
+		return json.dumps(json.loads(f.read()), separators=(',', ':')).encode('utf-8')
 
-def send_command(action, payload, server_id='cuemu', timeout=10):
-	if 'VAL_QUEUE' not in current_app.config:
-		return {"status": "error", "error": "Backend Unavailable"}
+# /api/taxonomy body, built once per taxonomy version
+taxonomy_document = PrecompressedDocument(_build_taxonomy_body)
 
-	cid = str(uuid.uuid4())
-	future = Queue()
-	response_futures[cid] = future
-	
+# CompiledTaxonomy (subtree index for the category filter), loaded on first use
+_taxonomy_cache = {}
+
+def current_taxonomy():
+	taxonomy = _taxonomy_cache.get('compiled')
+	if taxonomy is None:
+		taxonomy = _taxonomy_cache['compiled'] = load_taxonomy(os.path.dirname(os.path.abspath(__file__)))
+	return taxonomy
+
+def invalidate_taxonomy(data=None):
+	_taxonomy_cache.clear()
+	taxonomy_document.invalidate()
+
+def category_ranges(category):
+	"""
+	Inclusive resource_class_id intervals of a taxonomy subtree (label or id).
+	Raises KeyError for an unknown category.
+	"""
+	taxonomy = current_taxonomy()
+	index = taxonomy.find(category)
+	if index is None:
+		raise KeyError(category)
+	return taxonomy.subtree_ranges(index)
+
+# Active spawns per server, kept current by the workers' change notifications
+snapshot_store = SnapshotStore()
+
+def _stream_session(cookie_header):
+	"""Decodes the Flask session cookie for the stream server; None unless logged in."""
+	cookie = parse_cookie(cookie_header).get(app.config['SESSION_COOKIE_NAME'])
+	serializer = app.session_interface.get_signing_serializer(app)
+	if not cookie or serializer is None:
+		return None
+	try:
+		data = serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds()))
+	except Exception:
+		return None
+	return data if 'discord_id' in data else None
+
+# Schematic scoring over per-server stat matrices derived from the snapshots
+scoring_engine = ScoringEngine(snapshot_store)
+
+# SSE push of the snapshot changes, on its own port (see core.stream)
+change_stream = ChangeStream(snapshot_store, _stream_session, app.json.dumps)
+
+def _warm_taxonomy():
+	try:
+		taxonomy_document.get()
+	except Exception as e:
+		print(f"Taxonomy prebuild failed: {e}")
+
+def start_cache_listener():
+	"""Subscribes the web-side caches to invalidations broadcast by the validation workers."""
+	listener = NotificationListener()
+	permission_cache.attach(listener)
+	snapshot_store.attach(listener)
+	listener.subscribe(TAXONOMY_EVENT, invalidate_taxonomy)
+	listener.subscribe(RESYNC, invalidate_taxonomy)
+	listener.start()
+	change_stream.start()
+	# Compress the taxonomy before the first page load asks for it
+	threading.Thread(target=_warm_taxonomy, daemon=True).start()
+	return listener
+
+def _build_packet(action, payload, server_id, timeout):
 	user_context = {
 		"id": session.get('discord_id'),
 		"username": session.get('username'),
 		"avatar": session.get('avatar')
 	}
 	
-	packet = {
-		"id": cid,
+	return {
+		"id": str(uuid.uuid4()),
 		"action": action,
 		"payload": payload,
 		"server_id": server_id,
-		"user_context": user_context
+		"user_context": user_context,
+		"sent_at": time.time(),
+		# Absolute (epoch) deadline: workers drop the packet unexecuted once it has passed
+		"deadline": time.time() + timeout
 	}
+
+def send_command(action, payload, server_id='cuemu', timeout=10):
+	if 'VAL_ROUTER' not in current_app.config:
+		return {"status": "error", "error": "Backend Unavailable"}
+
+	packet = _build_packet(action, payload, server_id, timeout)
+	pending = reply_router.register(packet['id'], timeout)
 	
 	try:
-		current_app.config['VAL_QUEUE'].put(packet)
-		response = future.get(timeout=timeout)
+		# Route to the worker owning this server so per-server ordering is preserved
+		current_app.config['VAL_ROUTER'].admit(server_id, packet)
+		response = reply_router.wait(pending)
+		if response is None:
+			return {"status": "error", "error": "Request Timed Out"}
 		return response
-	except Empty:
-		return {"status": "error", "error": "Request Timed Out"}
+	except Overloaded as e:
+		return {"status": "error", "error": "Server Busy, please retry shortly.", "code": 503, "queue_depth": e.depth}
+	except Exception as e:
+		return {"status": "error", "error": str(e)}
+	finally:
+		reply_router.discard(pending.cid)
+
+def broadcast_command(action, payload, server_id='cuemu', timeout=10):
+	"""
+	Sends the command to every validation worker. Returns the first error, or success
+	with the per-worker 'data' collected in worker order.
+	"""
+	if 'VAL_ROUTER' not in current_app.config:
+		return {"status": "error", "error": "Backend Unavailable"}
+
+	pending = []
+	try:
+		for q in current_app.config['VAL_ROUTER'].queues:
+			packet = _build_packet(action, payload, server_id, timeout)
+			pending.append(reply_router.register(packet['id'], timeout))
+			q.put(packet, timeout=timeout)
+
+		result = {"status": "success", "error": None, "data": []}
+		for p in pending:
+			response = reply_router.wait(p)
+			if response is None:
+				return {"status": "error", "error": "Request Timed Out"}
+			if response.get('status') != 'success' and result['status'] == 'success':
+				result = response
+			result.setdefault('data', []).append(response.get('data'))
+		return result
 	except Exception as e:
 		return {"status": "error", "error": str(e)}
 	finally:
-		response_futures.pop(cid, None)
+		for p in pending:
+			reply_router.discard(p.cid)
+
+def command_error(resp):
+	"""Maps a failed send_command response onto an HTTP error (503 + Retry-After when shed)."""
+	if resp.get('code') == 503:
+		error = jsonify({"error": resp.get('error'), "queue_depth": resp.get('queue_depth')})
+		error.status_code = 503
+		error.headers['Retry-After'] = str(current_app.config.get('RETRY_AFTER', 2))
+		return error
+	return jsonify({"error": resp.get('error')}), 500
 
 @app.route('/')
 def index():
-	return render_template("index.html")
+	# Public URL of the SSE stream (empty while it is off, see core.stream)
+	return render_template("index.html", stream_url=change_stream.url if change_stream.port else "")
 
 # --- AUTHENTICATION ---
 
@@ -200,14 +320,7 @@ def get_current_user():
 	perms = {}
 	
 	try:
-		with DatabaseContext.cursor() as cur:
-			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (uid,))
-			row = cur.fetchone()
-			if row: is_super = row['is_superadmin']
-			
-			cur.execute("SELECT server_id, role FROM server_permissions WHERE user_id = %s", (uid,))
-			rows = cur.fetchall()
-			perms = {r['server_id']: r['role'] for r in rows}
+		is_super, perms = permission_cache.get_user_roles(uid)
 	except Exception as e:
 		print(f"DB Error in /api/me: {e}")
 
@@ -243,20 +356,7 @@ def get_managed_users():
 	
 	req_level = 0
 	try:
-		with DatabaseContext.cursor() as cur:
-			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (uid,))
-			user_row = cur.fetchone()
-			
-			if user_row and user_row['is_superadmin']:
-				req_level = ROLE_HIERARCHY['SUPERADMIN']
-			else:
-				cur.execute(
-					"SELECT role FROM server_permissions WHERE user_id = %s AND server_id = %s", 
-					(uid, server_id)
-				)
-				perm_row = cur.fetchone()
-				role_str = perm_row['role'] if perm_row else 'GUEST'
-				req_level = ROLE_HIERARCHY.get(role_str, 0)
+		req_level = ROLE_HIERARCHY.get(permission_cache.get_role(uid, server_id), 0)
 
 		if req_level < ROLE_HIERARCHY['EDITOR']:
 			return jsonify({"error": "Forbidden"}), 403
@@ -304,15 +404,7 @@ def get_command_log():
 	uid = session['discord_id']
 	req_level = 0
 	try:
-		with DatabaseContext.cursor() as cur:
-			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (uid,))
-			user_row = cur.fetchone()
-			if user_row and user_row['is_superadmin']:
-				req_level = 100
-			else:
-				cur.execute("SELECT role FROM server_permissions WHERE user_id = %s AND server_id = %s", (uid, server_id))
-				perm_row = cur.fetchone()
-				req_level = ROLE_HIERARCHY.get(perm_row['role'], 0) if perm_row else 0
+		req_level = ROLE_HIERARCHY.get(permission_cache.get_role(uid, server_id), 0)
 	except:
 		return jsonify({"error": "DB Error"}), 500
 
@@ -364,60 +456,289 @@ def reload_cache():
 	if 'discord_id' not in session: return jsonify({"error": "Unauthorized"}), 401
 	if not session.get('is_superadmin'): return jsonify({"error": "Forbidden"}), 403
 
-	resp = send_command("reload_cache", {})
+	# Every worker holds its own taxonomy cache
+	resp = broadcast_command("reload_cache", {})
+	# Workers also broadcast TAXONOMY_EVENT; dropping it here too makes the next GET see the reload
+	invalidate_taxonomy()
 	if resp['status'] == 'success':
 		return jsonify({"success": True, "message": "Cache reloaded."})
 	return jsonify({"error": resp.get('error')}), 500
 
+@app.route('/api/admin/queue-stats', methods=['GET'])
+def get_queue_stats():
+	if 'discord_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+	if not session.get('is_superadmin'): return jsonify({"error": "Forbidden"}), 403
+
+	router = current_app.config.get('VAL_ROUTER')
+	if not router:
+		return jsonify({"error": "Backend Unavailable"}), 503
+
+	# Counters kept by the workers themselves (expired drops etc.)
+	worker_resp = broadcast_command("worker_stats", {}, timeout=2)
+
+	return jsonify({
+		"workers": len(router),
+		"worker_stats": worker_resp.get('data') if worker_resp['status'] == 'success' else worker_resp.get('error'),
+		"queue_depths": router.depths(),
+		"high_water": router.high_water,
+		"rejected": router.rejected,
+		"replies": reply_router.stats(),
+		"snapshots": snapshot_store.stats(),
+		"stream": change_stream.stats(),
+		"scoring": scoring_engine.stats()
+	})
+
 # --- DATA ENDPOINTS ---
 
 @app.route('/api/resource_log', methods=['GET'])
 def queryResourceLog():
+	"""
+	Served from the in-memory snapshot. Pass back the returned 'next_seq' as 'since_seq' to
+	get only what changed since ('resources' upserted, 'removed' ids); 'full' means replace
+	everything.
+	"""
 	if 'discord_id' not in session:
 		return jsonify({"error": "Unauthorized", "resources": []}), 401
 
 	server_id = request.args.get('server', 'cuemu')
+	since_seq = request.args.get('since_seq', type=int)
 	try:
 		since = float(request.args.get('since', 0))
 	except:
 		since = 0
-	
-	sql = """
-		SELECT rs.*, 
-			   rt.class_label as type, 
-			   u.username as reporter_name,
-			   EXTRACT(EPOCH FROM rs.date_reported) as date_reported_ts,
-			   EXTRACT(EPOCH FROM rs.last_modified) as last_modified_ts
-		FROM resource_spawns rs
-		JOIN resource_taxonomy rt ON rs.resource_class_id = rt.id
-		LEFT JOIN users u ON rs.reporter_id = u.discord_id
-		WHERE rs.server_id = %s 
-		AND (EXTRACT(EPOCH FROM rs.date_reported) > %s 
-			 OR (rs.last_modified IS NOT NULL AND EXTRACT(EPOCH FROM rs.last_modified) > %s))
-		ORDER BY rs.date_reported DESC
+
+	# Optional taxonomy subtree ("Metal", "Flora Resources" or a class id)
+	ranges = None
+	category = request.args.get('category')
+	if category:
+		try:
+			ranges = category_ranges(category)
+		except KeyError:
+			return jsonify({"error": f"Unknown category: {category}", "resources": []}), 400
+
+	try:
+		snapshot = snapshot_store.get(server_id)
+	except Exception as e:
+		return jsonify({"error": str(e)}), 500
+
+	# Read the version first: a change landing in between is sent again next poll, never lost
+	next_seq = snapshot.version
+	try:
+		delta = snapshot.changes_since(since_seq, next_seq) if since_seq is not None else None
+		if delta is not None:
+			records, removed = delta
+			full = False
+		else:
+			records, removed = snapshot.all_records(), []
+			# Legacy timestamp polling (no since_seq yet)
+			full = not (since > 0 and since_seq is None)
+			if not full:
+				records = [r for r in records if r.changed_ts > since]
+				removed = snapshot.retired_since(since)
+	except Exception as e:
+		return jsonify({"error": str(e)}), 500
+
+	if ranges:
+		records = [r for r in records if any(lo <= r.class_id <= hi for lo, hi in ranges)]
+	if full:
+		records.sort(key=lambda r: r.id, reverse=True)
+		return _stream_resource_list(snapshot, records, next_seq)
+
+	return jsonify({
+		"resources": [snapshot.to_dict(r) for r in records],
+		"removed": removed,
+		"next_seq": next_seq,
+		"full": full
+	})
+
+@app.route('/api/resources/query', methods=['GET'])
+def query_resources():
 	"""
-	
+	One page of spawns, filtered and sorted in the database. Pass the returned 'next' back
+	as 'after' for the following page; it is null on the last one. See core.query.
+	"""
+	if 'discord_id' not in session:
+		return jsonify({"error": "Unauthorized", "resources": []}), 401
+
+	server_id = request.args.get('server', 'cuemu')
+	ranges = None
+	category = request.args.get('category')
+	if category:
+		try:
+			ranges = category_ranges(category)
+		except KeyError:
+			return jsonify({"error": f"Unknown category: {category}", "resources": []}), 400
+
+	try:
+		query = ResourceQuery(server_id, request.args, ranges)
+	except ValueError as e:
+		return jsonify({"error": str(e), "resources": []}), 400
+
+	try:
+		sql, params = query.sql()
+		with DatabaseContext.cursor() as cur:
+			cur.execute(sql, params)
+			rows, token = query.page(cur.fetchall())
+	except Exception as e:
+		return jsonify({"error": str(e)}), 500
+
+	return jsonify({"resources": rows, "next": token})
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+	"""Best current spawns of a taxonomy node (label or id) for one stat ('oq' or 'res_oq')."""
+	if 'discord_id' not in session:
+		return jsonify({"error": "Unauthorized", "resources": []}), 401
+
+	server_id = request.args.get('server', 'cuemu')
+	stat = (request.args.get('stat') or "").lower()
+	if stat and not stat.startswith("res_"):
+		stat = f"res_{stat}"
+	if stat not in STAT_COLS:
+		return jsonify({"error": f"Unknown stat: {stat}", "resources": []}), 400
+
+	taxonomy = current_taxonomy()
+	index = taxonomy.find(request.args.get('category') or "")
+	if index is None:
+		return jsonify({"error": f"Unknown category: {request.args.get('category')}", "resources": []}), 400
+
 	try:
 		with DatabaseContext.cursor() as cur:
-			cur.execute(sql, (server_id, since, since))
+			cur.execute("""
+				SELECT lb.rank, rs.*,
+					   rt.class_label as type,
+					   u.username as reporter_name,
+					   EXTRACT(EPOCH FROM rs.date_reported) as date_reported_ts,
+					   EXTRACT(EPOCH FROM rs.last_modified) as last_modified_ts
+				FROM resource_leaderboard lb
+				JOIN resource_spawns rs ON rs.id = lb.spawn_id
+				JOIN resource_taxonomy rt ON rs.resource_class_id = rt.id
+				LEFT JOIN users u ON rs.reporter_id = u.discord_id
+				WHERE lb.server_id = %s AND lb.node_id = %s AND lb.stat = %s
+				ORDER BY lb.rank
+			""", (server_id, int(taxonomy.ids[index]), stat))
 			rows = cur.fetchall()
-		return jsonify({"resources": rows})
 	except Exception as e:
 		return jsonify({"error": str(e)}), 500
 
+	return jsonify({"category": taxonomy.labels[index], "stat": stat, "resources": rows})
+
+@app.route('/api/score', methods=['GET'])
+def score_resources():
+	"""
+	Active spawns ranked by a schematic's stat weights, e.g. ?weights=oq:66,sr:33
+	&category=Metal&limit=25. 'score' is the weighted mean of the raw stats.
+	"""
+	if 'discord_id' not in session:
+		return jsonify({"error": "Unauthorized", "resources": []}), 401
+
+	server_id = request.args.get('server', 'cuemu')
+	try:
+		weights = parse_weights(request.args.get('weights'))
+		top = max(1, int(request.args.get('limit') or DEFAULT_TOP))
+	except ValueError as e:
+		return jsonify({"error": str(e), "resources": []}), 400
+
+	ranges = None
+	category = request.args.get('category')
+	if category:
+		try:
+			ranges = category_ranges(category)
+		except KeyError:
+			return jsonify({"error": f"Unknown category: {category}", "resources": []}), 400
+
+	try:
+		snapshot, ranked, elapsed = scoring_engine.score(server_id, weights, ranges, top)
+	except Exception as e:
+		return jsonify({"error": str(e)}), 500
+
+	resources = []
+	for record, score in ranked:
+		row = snapshot.to_dict(record)
+		row['score'] = score
+		resources.append(row)
+	return jsonify({"resources": resources, "scoring_ms": round(elapsed, 3)})
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+	"""
+	Spawn history of a taxonomy node (label or id): spawn count, first/last seen, and per
+	stat the distribution and best ever. Stat values (?oq=950&sr=700) are placed in their
+	distributions as percentiles.
+	"""
+	if 'discord_id' not in session:
+		return jsonify({"error": "Unauthorized"}), 401
+
+	server_id = request.args.get('server', 'cuemu')
+	category = request.args.get('category') or ""
+	try:
+		ranges = category_ranges(category)
+	except KeyError:
+		return jsonify({"error": f"Unknown category: {category}"}), 400
+
+	values = {}
+	for stat in STAT_COLS:
+		value = request.args.get(stat) or request.args.get(stat[4:])
+		if value:
+			try:
+				values[stat] = float(value)
+			except ValueError:
+				return jsonify({"error": f"{stat} must be a number."}), 400
+			# Stats run 1..1000; nan and inf would break the bucket math
+			if not math.isfinite(values[stat]) or not 1 <= values[stat] <= 1000:
+				return jsonify({"error": f"{stat} must be between 1 and 1000."}), 400
+
+	try:
+		with DatabaseContext.cursor() as cur:
+			history = class_history(cur, server_id, ranges, values)
+	except Exception as e:
+		return jsonify({"error": str(e)}), 500
+
+	# Seen right now when a spawn of it is still active
+	last_seen_ts = history.pop('last_seen_ts')
+	history['seconds_since_seen'] = 0 if history['active'] else (
+		round(time.time() - float(last_seen_ts)) if last_seen_ts is not None else None
+	)
+	taxonomy = current_taxonomy()
+	history['category'] = taxonomy.labels[taxonomy.find(category)]
+	return jsonify(history)
+
+def _stream_resource_list(snapshot, records, next_seq):
+	"""
+	Full sync body, encoded a batch of records at a time and sent chunked (gzipped when
+	accepted), so the web process never holds the whole document.
+	"""
+	body = iter_json_list(
+		"resources",
+		(snapshot.to_dict(r) for r in records),
+		{"removed": [], "next_seq": next_seq, "full": True},
+		encode=app.json.dumps
+	)
+	headers = {"Vary": "Accept-Encoding"}
+	if request.accept_encodings.best_match(["gzip", "identity"]) == "gzip":
+		body = gzip_chunks(body)
+		headers["Content-Encoding"] = "gzip"
+	return Response(body, mimetype="application/json", headers=headers)
+
 @app.route('/api/taxonomy', methods=['GET'])
 def get_taxonomy():
 	try:
-		base_dir = os.path.dirname(os.path.abspath(__file__))
-		path = os.path.join(base_dir, "assets", "resource_taxonomy.json")
-		with open(path, 'r') as f:
-			data = json.load(f)
-		resp = jsonify(data)
-		resp.headers['Cache-Control'] = 'public, max-age=86400'
-		return resp
+		doc = taxonomy_document.get()
 	except Exception as e:
 		return jsonify({"error": f"Taxonomy unavailable: {e}"}), 500
 
+	# Revalidate every time: a 304 is cheap, and a reload_cache shows up on the next page load
+	encoding = request.accept_encodings.best_match(doc.encodings) or "identity"
+	etag = doc.etag_for(encoding)
+	headers = {"ETag": f'"{etag}"', "Cache-Control": "public, no-cache", "Vary": "Accept-Encoding"}
+	# If-None-Match uses the weak comparison (a proxy may have weakened the tag)
+	if request.if_none_match.contains_weak(etag):
+		return Response(status=304, headers=headers)
+
+	if encoding != "identity":
+		headers["Content-Encoding"] = encoding
+	return Response(doc.bodies[encoding], mimetype="application/json", headers=headers)
+
 # --- WRITE OPERATIONS ---
 
 @app.route('/api/add-resource', methods=['POST'])
@@ -426,7 +747,7 @@ def add_resource():
 	data = request.json
 	resp = send_command("add_resource", data, server_id=data.get('server_id', 'cuemu'))
 	if resp['status'] == 'success': return jsonify({"success": True})
-	return jsonify({"error": resp.get('error')}), 500
+	return command_error(resp)
 
 @app.route('/api/update-resource', methods=['POST'])
 def update_resource():
@@ -434,7 +755,7 @@ def update_resource():
 	data = request.json
 	resp = send_command("update_resource", data, server_id=data.get('server_id', 'cuemu'))
 	if resp['status'] == 'success': return jsonify({"success": True})
-	return jsonify({"error": resp.get('error')}), 500
+	return command_error(resp)
 
 @app.route('/api/retire-resource', methods=['POST'])
 def retire_resource():
@@ -442,7 +763,7 @@ def retire_resource():
 	data = request.json
 	resp = send_command("retire_resource", data, server_id=data.get('server_id', 'cuemu'))
 	if resp['status'] == 'success': return jsonify({"success": True})
-	return jsonify({"error": resp.get('error')}), 500
+	return command_error(resp)
 
 @app.route('/api/set-role', methods=['POST'])
 def set_role():
@@ -450,7 +771,57 @@ def set_role():
 	data = request.json
 	resp = send_command("set_user_role", data, server_id=data.get('server_id', 'cuemu'))
 	if resp['status'] == 'success': return jsonify({"success": True})
-	return jsonify({"error": resp.get('error')}), 500
+	return command_error(resp)
+
+@app.route('/api/import-resources', methods=['POST'])
+def import_resources():
+	"""
+	Bulk spawn import. Accepts a CSV or JSON upload (multipart 'file', or the raw request
+	body) and returns a per-row accept/reject report. The upload is read a chunk at a time;
+	each chunk is validated and inserted by the server's Validation worker in one
+	transaction, which also updates the import's command_log entry.
+	"""
+	if 'discord_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+	server_id = request.args.get('server') or request.form.get('server_id') or 'cuemu'
+
+	upload = request.files.get('file')
+	if upload:
+		stream, fmt, source = upload.stream, detect_format(upload.filename, upload.mimetype), upload.filename
+	else:
+		stream, fmt, source = request.stream, detect_format(content_type=request.content_type), None
+
+	import_id = str(uuid.uuid4())
+	timeout = int(os.getenv("SWG_IMPORT_TIMEOUT", "30"))
+	report = []
+	totals = {"accepted": 0, "rejected": 0}
+	log_id = None # the import's command_log row, created by the first chunk
+
+	try:
+		for offset, chunk in iter_chunks(iter_rows(stream, fmt)):
+			payload = {
+				"import_id": import_id, "source": source, "offset": offset, "rows": chunk,
+				"totals": totals, "log_id": log_id
+			}
+			resp = send_command("import_resources", payload, server_id=server_id, timeout=timeout)
+			if resp['status'] != 'success':
+				if not report: return command_error(resp)
+				return _import_stopped(resp.get('error'), 503 if resp.get('code') == 503 else 500, totals, report)
+			report.extend(resp['data']['rows'])
+			totals = resp['data']['totals']
+			log_id = resp['data'].get('log_id')
+	except ValueError as e:
+		if not report: return jsonify({"error": f"Could not read import: {e}"}), 400
+		return _import_stopped(f"Could not read import: {e}", 400, totals, report)
+
+	if not report:
+		return jsonify({"error": "Import contains no rows."}), 400
+	return jsonify({"success": True, **totals, "rows": report})
+
+def _import_stopped(message, status, totals, report):
+	"""Earlier chunks are already committed: report them and where the import stopped."""
+	error = jsonify({"success": False, "error": message, "stopped_at_row": len(report) + 1, **totals, "rows": report})
+	error.status_code = status
+	return error
 
 
 # IMAGE SCANNING
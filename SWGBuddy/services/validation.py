@@ -4,12 +4,29 @@ SWGBuddy ValidationService Module
 The Gatekeeper. Handles all writes, permission checks, data integrity, and stat calculations.
 """
 import sys
-import re
 import json
 import os
+import signal
+import time
 import traceback
+from queue import Empty
+from psycopg2.extras import execute_values
 from core.core import Core
 from core.database import DatabaseContext
+from core.ipc import shard_of
+from core.schema import apply_schema
+from core.notify import NotificationListener, publish
+from core.permissions import permission_cache, publish_invalidation
+from core.scheduler import LaneScheduler
+from core.history import rebuild as rebuild_history, record_retirements
+from core.leaderboard import Leaderboards
+from core.sketch import StatSketches
+from core.snapshot import publish_spawn_changes
+from core.taxonomy import PCT_COLS, RATING_COLS, STAT_COLS, TAXONOMY_EVENT, load_taxonomy
+
+class DuplicateResource(ValueError):
+	"""add_resource for a (server_id, name) that already exists."""
+
 
 class ValidationService(Core):
 	# Role Power Levels
@@ -22,71 +39,162 @@ class ValidationService(Core):
 	}
 
 	# Maps JSON keys to DB Columns
-	STAT_COLS = [
-		"res_oq", "res_cd", "res_dr", "res_fl", "res_hr", 
-		"res_ma", "res_pe", "res_sr", "res_ut", "res_cr"
-	]
+	STAT_COLS = STAT_COLS
+
+	# Actions without a command_permissions row that share another action's level
+	PERMISSION_FALLBACK = {"import_resources": "add_resource"}
+
+	# Column order of the multi-row INSERT used by import_resources
+	IMPORT_COLS = (
+		("server_id", "resource_class_id", "name", "planet", "res_weight_rating", "notes", "reporter_id")
+		+ STAT_COLS + RATING_COLS + PCT_COLS
+	)
+
+	# Actions applied through the group-commit write pipeline
+	WRITE_ACTIONS = ("add_resource", "update_resource")
+
+	# Max packets drained from the queue per pass. A group commit is one write-lane turn, so
+	# its size is capped by SWG_LANE_WEIGHT_WRITE (see LANES), not by this
+	WRITE_BATCH_MAX = int(os.getenv("SWG_WRITE_BATCH_MAX", "64"))
+
+	# Seconds an idle worker waits for a packet before doing its periodic work (sketch
+	# flushes) and checking for shutdown
+	IDLE_WAIT = float(os.getenv("SWG_IDLE_WAIT", "1"))
+
+	# Seconds a just-added (or already existing) name short-circuits duplicate add_resource packets
+	RECENT_NAME_TTL = float(os.getenv("SWG_RECENT_NAME_TTL", "30"))
+
+	# Lane weights (packets per scheduling round): interactive writes, auth sync, admin/housekeeping
+	LANES = (
+		("write", int(os.getenv("SWG_LANE_WEIGHT_WRITE", "16"))),
+		("auth", int(os.getenv("SWG_LANE_WEIGHT_AUTH", "4"))),
+		("admin", int(os.getenv("SWG_LANE_WEIGHT_ADMIN", "1")))
+	)
 
-	def __init__(self, input_queue, log_queue, reply_queue=None):
+	def __init__(self, input_queue, log_queue, reply_queue=None, worker_id=0, workers=1):
 		super().__init__(log_queue)
 		self.input_queue = input_queue
 		self.reply_queue = reply_queue
+		self.worker_id = worker_id
+		self.workers = workers # pool size, to tell which servers are this worker's shard
 		self.running = True
+
+		# Tag logs per worker so the pool can be told apart
+		self.mod = f"{self.mod}-{worker_id}"
 		
 		# Caches
-		self.valid_resources = {} # Will be populated by flattening the tree
-	
-	def _flatten_taxonomy(self, nodes):
-		"""Recursively walks the tree to build the label -> config map."""
-		for node in nodes:
-			if node.get('is_valid'):
-				self.valid_resources[node['label']] = {
-					"id": node['id'],
-					"stats": node.get('stats', {}),
-					"planets": node.get('planets', [])
-				}
-			
-			if node.get('children'):
-				self._flatten_taxonomy(node['children'])
+		self.validators = {} # label -> compiled ResourceValidator (see core.taxonomy)
+		self.leaderboards = None # top-K per (node, stat), kept current on every write
+		self.sketches = StatSketches() # per (server, class, stat) histograms for the *_pct columns
+
+		# Counters reported through the worker_stats action
+		self.stats = {"processed": 0, "expired_drops": 0, "coalesced": 0}
+		self._last_expiry_log = 0
 
+		# (server_id, normalized name) -> expiry of names known to exist; this worker owns the
+		# server's shard, so it sees every add for it
+		self.recent_names = {}
+
+		# Priority lanes fed from input_queue
+		self.scheduler = LaneScheduler(self.LANES)
+	
 	def run(self):
 		DatabaseContext.initialize()
-		self.info("Initializing Validation Service...")
+		self.info(f"Initializing Validation Service (Worker {self.worker_id})...")
 		
 		# 1. Load Single Taxonomy File
 		try:
-			json_path = os.path.join(os.getcwd(), "assets", "resource_taxonomy.json")
-			with open(json_path, 'r') as f:
-				tree_data = json.load(f)
-			
-			# Flatten tree into self.valid_resources map
-			self._flatten_taxonomy(tree_data)
-			self.info(f"Loaded taxonomy. Valid types: {len(self.valid_resources)}")
+			# Precompiled artifact (or the JSON when it is stale), then per-type validators
+			taxonomy = load_taxonomy(log=self.warning)
+			self.validators = taxonomy.validators()
+			self.leaderboards = Leaderboards(taxonomy)
+			self.info(f"Loaded taxonomy. Valid types: {len(self.validators)}")
 			
 		except Exception as e:
 			self.critical(f"FATAL: Failed to load resource_taxonomy.json: {e}")
 			return
 
-		# 2. Hydrate DB Caches
+		# 2. Apply Schema & Hydrate DB Caches
 		try:
+			apply_schema()
 			self._hydrate_permissions()
 		except Exception as e:
-			self.critical(f"FATAL: Failed to hydrate DB maps: {e}")
+			self.critical(f"FATAL: Failed to apply schema or hydrate DB maps: {e}")
 			return
 
+		# Boards and history only change on writes: build them for spawns that predate them
+		try:
+			self._build_missing_leaderboards()
+		except Exception as e:
+			self.error(f"Failed to build leaderboards: {e}")
+		try:
+			self._build_missing_history()
+		except Exception as e:
+			self.error(f"Failed to build spawn history: {e}")
+
+		# Role cache invalidations broadcast by the other processes
+		self.listener = NotificationListener()
+		permission_cache.attach(self.listener)
+		self.listener.start()
+
+		# ServiceManager.stop terminates the workers: finish the lanes and save the sketches first
+		signal.signal(signal.SIGTERM, self._terminate)
+
 		self.info("Validation Service Ready.")
 
-		# 3. Main Loop
-		while self.running:
+		# 3. Main Loop: refill the lanes, then serve one lane turn
+		while self.running or len(self.scheduler):
 			try:
-				message = self.input_queue.get()
-				if message is None: break
-				self._process_message(message)
+				if self.running:
+					self._drain_queue()
+				self.sketches.flush()
+				lane, batch = self.scheduler.next_batch()
+				if not batch: continue
+
+				started = time.time()
+				self._process_batch(batch)
+				self.scheduler.record(lane, batch, time.time() - started)
 			except KeyboardInterrupt:
 				self.running = False
 			except Exception as e:
 				self.error(f"Worker Loop Crash: {e}\n{traceback.format_exc()}")
 
+		try:
+			self.sketches.flush(force=True)
+		except Exception as e:
+			self.error(f"Failed to save stat sketches: {e}")
+
+	def _build_missing_leaderboards(self):
+		"""Rebuilds the boards of every server in this worker's shard that has spawns but no boards."""
+		with DatabaseContext.cursor() as cur:
+			cur.execute("""
+				SELECT DISTINCT server_id FROM resource_spawns
+				EXCEPT SELECT DISTINCT server_id FROM resource_leaderboard
+			""")
+			servers = [r['server_id'] for r in cur.fetchall() if shard_of(r['server_id'], self.workers) == self.worker_id]
+		for server_id in servers:
+			# One transaction per server; nothing else writes them until the loop starts
+			with DatabaseContext.cursor(commit=True) as cur:
+				boards = self.leaderboards.rebuild(cur, server_id)
+			self.info(f"Built {boards:,} leaderboards for {server_id}.")
+
+	def _build_missing_history(self):
+		"""Builds the history aggregates of every server in this worker's shard that has retired spawns but none."""
+		with DatabaseContext.cursor() as cur:
+			cur.execute("""
+				SELECT DISTINCT server_id FROM retired_resources
+				EXCEPT SELECT DISTINCT server_id FROM resource_history
+			""")
+			servers = [r['server_id'] for r in cur.fetchall() if shard_of(r['server_id'], self.workers) == self.worker_id]
+		for server_id in servers:
+			# Retirements fold into these tables, and only this worker retires the server's spawns
+			with DatabaseContext.cursor(commit=True) as cur:
+				spawns = rebuild_history(cur, server_id)
+			self.info(f"Built spawn history of {spawns:,} retired spawns for {server_id}.")
+
+	def _terminate(self, signum, frame):
+		self.running = False
+
 	def _hydrate_permissions(self):
 		"""Loads command permissions from the database."""
 		with DatabaseContext.cursor() as cur:
@@ -98,6 +206,80 @@ class ValidationService(Core):
 	# ----------------------------------------------------------------------
 	# MESSAGE PROCESSING
 	# ----------------------------------------------------------------------
+	def _drain_queue(self):
+		"""
+		Moves queued packets into the priority lanes. Waits (up to IDLE_WAIT) only when every
+		lane is empty; otherwise takes just what is already waiting (up to WRITE_BATCH_MAX per pass).
+		"""
+		drained = []
+		if not len(self.scheduler):
+			try:
+				drained.append(self.input_queue.get(timeout=self.IDLE_WAIT))
+			except Empty:
+				return
+
+		while len(drained) < self.WRITE_BATCH_MAX and len(self.scheduler) + len(drained) < 4 * self.WRITE_BATCH_MAX:
+			try:
+				drained.append(self.input_queue.get_nowait())
+			except Empty:
+				break
+
+		for packet in drained:
+			# Shutdown Sentinel: finish what was drained before it, then stop
+			if packet is None:
+				self.running = False
+				break
+			self.scheduler.push(packet)
+
+	def _expired(self, packet):
+		"""True if the requester has already given up on this packet (its deadline passed)."""
+		deadline = packet.get('deadline')
+		if not deadline or time.time() <= deadline:
+			return False
+
+		self.stats['expired_drops'] += 1
+		# Rate-limited: a backlog can expire thousands of packets at once
+		if time.time() - self._last_expiry_log >= 10:
+			self._last_expiry_log = time.time()
+			self.warning(f"Dropped expired {packet.get('action')} ({time.time() - deadline:.1f}s past deadline). Total expired: {self.stats['expired_drops']}")
+		return True
+
+	def _process_batch(self, batch):
+		"""Runs one lane turn in arrival order, folding consecutive writes into one group commit."""
+		writes = []
+		for packet in batch:
+			# Nobody is waiting for the result: skip before touching the DB
+			if self._expired(packet):
+				continue
+			self.stats['processed'] += 1
+			if packet.get('action') in self.WRITE_ACTIONS:
+				writes.append(packet)
+				continue
+			if writes:
+				self._process_write_batch(writes)
+				writes = []
+			self._process_message(packet)
+
+		if writes:
+			self._process_write_batch(writes)
+
+	def _authorize(self, action, user_ctx, server_id):
+		required_power = self.command_permissions.get(
+			action, self.command_permissions.get(self.PERMISSION_FALLBACK.get(action), 100)
+		)
+		
+		if action == 'sync_user':
+			required_power = 0
+
+		if required_power > 0:
+			is_allowed, user_role = self._check_permission(user_ctx, server_id, required_power)
+			if not is_allowed:
+				raise PermissionError(f"Insufficient Permissions. Your Role: {user_role}, Required Level: {required_power}")
+
+	def _reply(self, response):
+		if self.reply_queue and response.get('id'):
+			self.reply_queue.put(response)
+
 	def _process_message(self, packet):
 		action = packet.get('action')
 		payload = packet.get('payload') or {}
@@ -105,33 +287,18 @@ class ValidationService(Core):
 		server_id = packet.get('server_id', 'cuemu')
 		correlation_id = packet.get('id')
 		
+		if action in self.WRITE_ACTIONS:
+			return self._process_write_batch([packet])
+
 		response = {"id": correlation_id, "status": "success", "error": None}
 
 		try:
-			required_power = self.command_permissions.get(action, 100)
-			
-			if action == 'sync_user':
-				required_power = 0
-
-			if required_power > 0:
-				is_allowed, user_role = self._check_permission(user_ctx, server_id, required_power)
-				if not is_allowed:
-					raise PermissionError(f"Insufficient Permissions. Your Role: {user_role}, Required Level: {required_power}")
+			self._authorize(action, user_ctx, server_id)
 
 			if action == "sync_user":
 				self._sync_user(payload)
 				# self._log_command(server_id, user_ctx, action, payload)
 
-			elif action == "add_resource":
-				self._handle_write(payload, server_id, is_new=True, user_ctx=user_ctx)
-				self._log_command(server_id, user_ctx, action, payload) # <--- Log
-				self.info(f"User {user_ctx.get('username')} added resource: {payload.get('name')}")
-
-			elif action == "update_resource":
-				self._handle_write(payload, server_id, is_new=False, user_ctx=user_ctx)
-				self._log_command(server_id, user_ctx, action, payload) # <--- Log
-				self.info(f"User {user_ctx.get('username')} updated resource ID: {payload.get('id')}")
-
 			elif action == "retire_resource":
 				self._retire_resource(payload, server_id)
 				self._log_command(server_id, user_ctx, action, payload) # <--- Log
@@ -142,10 +309,16 @@ class ValidationService(Core):
 				self._log_command(server_id, user_ctx, action, payload) # <--- Log
 				self.info(f"Role change: {payload.get('target_user_id')} -> {payload.get('role')} on {server_id}")
 			
+			elif action == "import_resources":
+				response['data'] = self._import_resources(payload, server_id, user_ctx)
+
 			elif action == "reload_cache":
 				self._reload_cache()
 				self.info(f"Admin {user_ctx.get('username')} triggered cache reload.")
 
+			elif action == "worker_stats":
+				response['data'] = self._worker_stats()
+
 			else:
 				raise ValueError(f"No handler for action: {action}")
 
@@ -158,9 +331,176 @@ class ValidationService(Core):
 			response['status'] = 'error'
 			response['error'] = "Internal Server Error"
 		
-		if self.reply_queue and correlation_id:
-			self.reply_queue.put(response)
-	
+		self._reply(response)
+
+	def _process_write_batch(self, packets):
+		"""
+		Group commit for add/update packets.
+
+		The whole batch shares one connection and one COMMIT. Each packet runs inside its own
+		SAVEPOINT so a rejected packet does not abort the others, and the command_log rows
+		are written with a single multi-row INSERT before the commit.
+		"""
+		# Earlier work in this batch may have pushed some packets past their deadline
+		packets = [p for p in packets if not self._expired(p)]
+		if not packets:
+			return
+
+		responses = [{"id": p.get('id'), "status": "success", "error": None} for p in packets]
+		log_rows = []
+		done = []
+		# server_id -> spawn ids written, announced to the web snapshot on COMMIT
+		changed = {}
+		# Single-flight: names added (or found to exist) earlier in this batch
+		inflight = set()
+		# (server_id, class_id, data) of added spawns, counted in the stat sketches on COMMIT
+		observed = []
+
+		try:
+			with DatabaseContext.cursor(commit=True) as cur:
+				for packet, response in zip(packets, responses):
+					action = packet.get('action')
+					payload = packet.get('payload') or {}
+					user_ctx = packet.get('user_context', {})
+					server_id = packet.get('server_id', 'cuemu')
+					name_key = self._name_key(server_id, payload.get('name')) if action == "add_resource" else None
+
+					try:
+						self._authorize(action, user_ctx, server_id)
+
+						# Duplicate of a name that is in flight or was just added: reuse that outcome
+						if name_key and (name_key in inflight or self._recently_added(name_key)):
+							self.stats['coalesced'] += 1
+							raise DuplicateResource(f"Error: {payload.get('name')} already exists for {server_id}")
+
+						cur.execute("SAVEPOINT write_packet")
+						added = []
+						try:
+							spawn_id = self._handle_write(cur, payload, server_id, is_new=(action == "add_resource"), user_ctx=user_ctx, observed=added)
+						except Exception:
+							cur.execute("ROLLBACK TO SAVEPOINT write_packet")
+							raise
+						cur.execute("RELEASE SAVEPOINT write_packet")
+						observed.extend(added)
+
+						if name_key: inflight.add(name_key)
+						changed.setdefault(server_id, []).append(spawn_id)
+						log_rows.append((server_id, user_ctx.get('id'), user_ctx.get('username'), action, json.dumps(payload)))
+						done.append((action, payload, user_ctx))
+					except (PermissionError, ValueError) as e:
+						if name_key and isinstance(e, DuplicateResource): inflight.add(name_key)
+						self.warning(f"Rejected {action}: {e}")
+						response['status'] = 'error'
+						response['error'] = str(e)
+					except Exception as e:
+						self.error(f"System Error on {action}: {e}\n{traceback.format_exc()}")
+						response['status'] = 'error'
+						response['error'] = "Internal Server Error"
+
+				if log_rows:
+					self._log_commands(cur, log_rows)
+				for server_id, ids in changed.items():
+					self.leaderboards.refresh(cur, server_id, ids)
+					publish_spawn_changes(cur, server_id, ids)
+
+			# Only committed names may short-circuit later submissions, and only committed
+			# spawns are counted
+			for name_key in inflight:
+				self._remember_name(name_key)
+			for args in observed:
+				self.sketches.observe(*args)
+
+		except Exception as e:
+			# Commit (or the connection) failed: nothing in this batch was persisted
+			self.error(f"Write batch of {len(packets)} failed: {e}\n{traceback.format_exc()}")
+			done = []
+			for response in responses:
+				if response['status'] == 'success':
+					response['status'] = 'error'
+					response['error'] = "Internal Server Error"
+
+		for action, payload, user_ctx in done:
+			if action == "add_resource":
+				self.info(f"User {user_ctx.get('username')} added resource: {payload.get('name')}")
+			else:
+				self.info(f"User {user_ctx.get('username')} updated resource ID: {payload.get('id')}")
+		if len(packets) > 1:
+			self.debug(f"Group commit: {len(done)}/{len(packets)} writes in one transaction.")
+
+		for response in responses:
+			self._reply(response)
+
+	# ----------------------------------------------------------------------
+	# RECENT NAMES (single-flight for add_resource)
+	# ----------------------------------------------------------------------
+	@staticmethod
+	def _name_key(server_id, name):
+		if not name: return None
+		# Same normalization ResourceValidator.validate applies before the insert
+		return (server_id, " ".join(str(name).split()))
+
+	def _recently_added(self, name_key):
+		expires = self.recent_names.get(name_key)
+		if expires is None:
+			return False
+		if expires < time.monotonic():
+			del self.recent_names[name_key]
+			return False
+		return True
+
+	def _remember_name(self, name_key):
+		now = time.monotonic()
+		if len(self.recent_names) >= 10000:
+			self.recent_names = {k: v for k, v in self.recent_names.items() if v >= now}
+		self.recent_names[name_key] = now + self.RECENT_NAME_TTL
+
+	def _worker_stats(self):
+		try:
+			depth = self.input_queue.qsize()
+		except NotImplementedError:
+			depth = None
+		return dict(self.stats, worker_id=self.worker_id, queue_depth=depth, lanes=self.scheduler.stats())
+
+	def _log_commands(self, cur, rows):
+		"""Batched command_log insert inside the caller's transaction. Failures never abort the writes."""
+		cur.execute("SAVEPOINT command_log")
+		try:
+			execute_values(cur, """
+				INSERT INTO command_log (server_id, user_id, username, command, details)
+				VALUES %s
+			""", rows)
+			cur.execute("RELEASE SAVEPOINT command_log")
+		except Exception as e:
+			cur.execute("ROLLBACK TO SAVEPOINT command_log")
+			self.error(f"Failed to write to command log: {e}")
+
+	def _log_import(self, cur, server_id, user_ctx, log_id, details):
+		"""
+		Creates (or, given log_id, updates) an import's command_log summary inside the chunk's
+		transaction. Returns its id, or None if it could not be written; never aborts the writes.
+		"""
+		cur.execute("SAVEPOINT command_log")
+		try:
+			row = None
+			if log_id:
+				cur.execute(
+					"UPDATE command_log SET details = %s WHERE id = %s AND server_id = %s AND command = 'import_resources' RETURNING id",
+					(json.dumps(details), log_id, server_id)
+				)
+				row = cur.fetchone()
+			if row is None:
+				cur.execute("""
+					INSERT INTO command_log (server_id, user_id, username, command, details)
+					VALUES (%s, %s, %s, 'import_resources', %s) RETURNING id
+				""", (server_id, user_ctx.get('id'), user_ctx.get('username'), json.dumps(details)))
+				row = cur.fetchone()
+			cur.execute("RELEASE SAVEPOINT command_log")
+			return row['id']
+		except Exception as e:
+			cur.execute("ROLLBACK TO SAVEPOINT command_log")
+			self.error(f"Failed to write to command log: {e}")
+			return None
+
 	def _log_command(self, server_id, user_ctx, command, details):
 		"""Inserts a record into the command_log."""
 		try:
@@ -185,17 +525,20 @@ class ValidationService(Core):
 			self.error(f"Failed to write to command log: {e}")
 
 	def _reload_cache(self):
-		"""Re-reads the JSON taxonomy from disk."""
+		"""Re-reads the taxonomy (artifact or JSON) from disk."""
 		try:
-			json_path = os.path.join(os.getcwd(), "assets", "resource_taxonomy.json")
-			with open(json_path, 'r') as f:
-				tree_data = json.load(f)
-			
-			self.valid_resources = {}
-			self._flatten_taxonomy(tree_data)
+			taxonomy = load_taxonomy(log=self.warning)
+			self.validators = taxonomy.validators()
+			self.leaderboards = Leaderboards(taxonomy)
 			self._hydrate_permissions()
+
+			# Drop every cached role, here and in every other process
+			permission_cache.invalidate()
+			with DatabaseContext.cursor(commit=True) as cur:
+				publish_invalidation(cur)
+				publish(cur, TAXONOMY_EVENT)
 			
-			self.info(f"Cache Reloaded. Valid types: {len(self.valid_resources)}")
+			self.info(f"Cache Reloaded. Valid types: {len(self.validators)}")
 		except Exception as e:
 			self.error(f"Failed to reload cache: {e}")
 			raise e
@@ -203,25 +546,104 @@ class ValidationService(Core):
 	# ----------------------------------------------------------------------
 	# COMMAND LOGIC
 	# ----------------------------------------------------------------------
-	def _handle_write(self, data, server_id, is_new, user_ctx=None):
-		"""Unified Add/Edit logic with calculation and uniqueness check."""
+	def _handle_write(self, cur, data, server_id, is_new, user_ctx=None, observed=None):
+		"""
+		Unified Add/Edit logic with calculation and uniqueness check. Returns the spawn id.
+		An added spawn's (server_id, class_id, data) goes to observed, for the caller to count
+		in the stat sketches once the transaction commits.
+		"""
 		
-		self._validate_resource(data)
-		self._calculate_ratings(data)
+		# Validation + ratings in one pass over the compiled rules
+		validator = self._get_rules(data).validate(data)
+		# Class percentiles of the stats being written; never taken from the client
+		for col in PCT_COLS:
+			data.pop(col, None)
+		data.update(self.sketches.percentiles(server_id, validator.class_id, data))
 
 		if is_new:
-			name = data.get('name')
-			if self._resource_exists(name, server_id):
-				raise ValueError(f"Error: {name} already exists for {server_id}")
-			self._insert_resource(data, server_id, user_ctx)
-		else:
-			self._update_resource(data, user_ctx)
+			spawn_id = self._insert_resource(cur, data, server_id, user_ctx, validator)
+			if observed is not None:
+				observed.append((server_id, validator.class_id, data))
+			return spawn_id
+		return self._update_resource(cur, data, server_id, user_ctx)
 
-	def _resource_exists(self, name, server_id):
-		if not name: return False
-		with DatabaseContext.cursor() as cur:
-			cur.execute("SELECT 1 FROM resource_spawns WHERE name = %s AND server_id = %s", (name, server_id))
-			return cur.fetchone() is not None
+	def _import_resources(self, payload, server_id, user_ctx):
+		"""
+		One chunk of a bulk import. Every row goes through the same validator as add_resource;
+		the accepted rows are then inserted with a single multi-row INSERT ... ON CONFLICT
+		DO NOTHING, so names that already exist come back as rejections instead of errors.
+		The first chunk writes the one command_log entry summarizing the import and every
+		later chunk (payload log_id) updates it in its own transaction, so the entry always
+		covers exactly the committed chunks, however the import ends.
+
+		Returns the per-row report: {"row", "name", "status": accepted|rejected, "error"},
+		the running totals and the log_id for the next chunk.
+		"""
+		rows = payload.get('rows') or []
+		offset = int(payload.get('offset') or 0)
+		report = []
+		accepted = [] # (report entry, name_key, values)
+		counted = {} # name -> (class_id, data), for the stat sketches once inserted
+		seen = set()
+
+		for i, data in enumerate(rows):
+			entry = {"row": offset + i + 1, "name": data.get('name'), "status": "accepted", "error": None}
+			report.append(entry)
+			try:
+				validator = self._get_rules(data).validate(data)
+				# Never taken from the file, as in _handle_write
+				for col in PCT_COLS:
+					data.pop(col, None)
+				data.update(self.sketches.percentiles(server_id, validator.class_id, data))
+				entry['name'] = data['name']
+				name_key = self._name_key(server_id, data['name'])
+				if name_key in seen:
+					raise DuplicateResource(f"Duplicate of an earlier row: {data['name']}")
+				seen.add(name_key)
+				if self._recently_added(name_key):
+					raise DuplicateResource(f"Error: {data['name']} already exists for {server_id}")
+				accepted.append((entry, name_key, self._import_values(data, server_id, user_ctx, validator)))
+				counted[data['name']] = (validator.class_id, data)
+			except ValueError as e:
+				entry['status'] = 'rejected'
+				entry['error'] = str(e)
+
+		with DatabaseContext.cursor(commit=True) as cur:
+			if accepted:
+				inserted = execute_values(cur, f"""
+					INSERT INTO resource_spawns ({','.join(self.IMPORT_COLS)}) VALUES %s
+					ON CONFLICT (server_id, name) DO NOTHING
+					RETURNING id, name
+				""", [values for _, _, values in accepted], page_size=len(accepted), fetch=True)
+				self.leaderboards.refresh(cur, server_id, [r['id'] for r in inserted])
+				publish_spawn_changes(cur, server_id, [r['id'] for r in inserted])
+				inserted = {r['name'] for r in inserted}
+				counted = {name: counted[name] for name in inserted}
+
+				for entry, _, _ in accepted:
+					if entry['name'] not in inserted:
+						entry['status'] = 'rejected'
+						entry['error'] = f"Error: {entry['name']} already exists for {server_id}"
+
+			count = sum(1 for entry in report if entry['status'] == 'accepted')
+			totals = payload.get('totals') or {}
+			totals = {
+				"accepted": int(totals.get('accepted', 0)) + count,
+				"rejected": int(totals.get('rejected', 0)) + len(report) - count
+			}
+			details = {"import_id": payload.get('import_id'), "source": payload.get('source'), "rows": offset + len(rows), **totals}
+			log_id = self._log_import(cur, server_id, user_ctx, payload.get('log_id'), details)
+
+		# Inserted or already present, every accepted name now exists; only the inserted
+		# spawns are counted, now that they are committed
+		for _, name_key, _ in accepted:
+			self._remember_name(name_key)
+		if accepted:
+			for class_id, data in counted.values():
+				self.sketches.observe(server_id, class_id, data)
+
+		self.info(f"User {user_ctx.get('username')} imported {count}/{len(rows)} resources (rows {offset + 1}-{offset + len(rows)}).")
+		return {"rows": report, "totals": totals, "log_id": log_id}
 
 	def _retire_resource(self, data, server_id):
 		res_id = data.get('id')
@@ -232,14 +654,27 @@ class ValidationService(Core):
 			INSERT INTO retired_resources 
 			SELECT * FROM resource_spawns 
 			WHERE id = %s AND server_id = %s
+			RETURNING *
 		"""
 		sql_delete = "DELETE FROM resource_spawns WHERE id = %s AND server_id = %s"
 
 		with DatabaseContext.cursor(commit=True) as cur:
 			cur.execute(sql_move, (res_id, server_id))
-			if cur.rowcount == 0:
+			retired = cur.fetchone()
+			if retired is None:
 				raise ValueError("Resource not found or already retired.")
 			cur.execute(sql_delete, (res_id, server_id))
+			self.leaderboards.refresh(cur, server_id, [res_id])
+			record_retirements(cur, server_id, [retired])
+			# Tombstone on the change sequence, so delta clients learn about the removal in order
+			cur.execute(
+				"INSERT INTO resource_tombstones (server_id, spawn_id) VALUES (%s, %s) RETURNING change_seq",
+				(server_id, res_id)
+			)
+			publish_spawn_changes(cur, server_id, removed=[(res_id, cur.fetchone()['change_seq'])])
+
+		# The name is free again
+		self.recent_names.pop(self._name_key(server_id, retired['name']), None)
 
 	def _set_user_role(self, requester_ctx, payload, server_id):
 		target_uid = payload.get('target_user_id')
@@ -273,6 +708,8 @@ class ValidationService(Core):
 		"""
 		with DatabaseContext.cursor(commit=True) as cur:
 			cur.execute(sql, (target_uid, server_id, target_role, req_uid))
+			publish_invalidation(cur, target_uid)
+		permission_cache.invalidate(target_uid)
 
 	# ----------------------------------------------------------------------
 	# STAT CALCULATIONS & VALIDATION
@@ -282,106 +719,48 @@ class ValidationService(Core):
 		if not label:
 			raise ValueError(f"Missing Resource Type/Label")
 		
-		rules = self.valid_resources.get(label)
-		if not rules:
+		validator = self.validators.get(label)
+		if not validator:
 			raise ValueError(f"Resource type '{label}' is not valid for spawning.")
-		return rules
-
-	def _validate_resource(self, data):
-		rules = self._get_rules(data)
-		stats_def = rules.get('stats', {})
-		allowed_planets = rules.get('planets', [])
-
-		# HARDENING 1: Name Validation (Regex: Alphanumeric, spaces, parens, hyphens)
-		name = data.get('name', '')
-		if not name:
-			raise ValueError("Resource name is required.")
-		if not re.match(r'^[a-zA-Z0-9\s\-\(\)\.]+$', name):
-			raise ValueError("Invalid characters in Resource Name.")
-		if len(name) > 100:
-			raise ValueError("Name too long.")
-
-		# HARDENING 2: Sanitize Notes (Strip HTML tags)
-		notes = data.get('notes', '')
-		if notes:
-			# Simple tag stripping since we don't have bleach
-			clean_notes = re.sub(r'<[^>]*>', '', notes) 
-			data['notes'] = clean_notes
-
-		# Planet Validation
-		planet_input = data.get('planet')
-		if planet_input:
-			if isinstance(planet_input, list):
-				clean_list = [str(p).capitalize() for p in planet_input]
-				data['planet'] = clean_list 
-				for p in clean_list:
-					if p not in allowed_planets:
-						raise ValueError(f"Planet '{p}' is not valid for this resource type.")
-			else:
-				planet_str = str(planet_input).capitalize()
-				data['planet'] = planet_str 
-				if planet_str not in allowed_planets:
-					raise ValueError(f"Planet '{planet_str}' is not valid for this resource type.")
-
-		# Stat Validation (Unchanged)
-		for stat in self.STAT_COLS:
-			val = data.get(stat)
-			if val is None or val == "": continue
-			try:
-				val = int(val)
-			except: 
-				raise ValueError(f"{stat} must be an integer")
-
-			if stat not in stats_def:
-				if val > 0: raise ValueError(f"{stat} is not applicable for this resource.")
-				continue
-
-			mn = stats_def[stat]['min']
-			mx = stats_def[stat]['max']
-			if not (mn <= val <= mx):
-				raise ValueError(f"{stat} value {val} is out of range ({mn}-{mx}).")
-
-	def _calculate_ratings(self, data):
-		rules = self._get_rules(data)
-		stats_def = rules.get('stats', {})
-		valid_ratings = []
-
-		for stat in self.STAT_COLS:
-			val = data.get(stat)
-			if val is None or val == "" or str(val) == "0": continue
-				
-			val = int(val)
-			stat_max = stats_def[stat]['max']
-			rating = round(val / stat_max, 3) if stat_max > 0 else 0.0
-			
-			data[f"{stat}_rating"] = rating
-			valid_ratings.append(rating)
-
-		if valid_ratings:
-			avg = sum(valid_ratings) / len(valid_ratings)
-			data['res_weight_rating'] = round(avg, 3)
-		else:
-			data['res_weight_rating'] = 0.0
+		return validator
 
 	# ----------------------------------------------------------------------
 	# DB UTILS
 	# ----------------------------------------------------------------------
-	def _insert_resource(self, data, server_id, user_ctx):
-		label = data.get('type')
-		rules = self.valid_resources.get(label, {})
-		res_class_id = rules.get('id')
-		allowed_planets = rules.get('planets')
-		# Get Reporter ID
-		reporter_id = user_ctx.get('id') if user_ctx else None
+	@staticmethod
+	def _planet_array(data, validator):
+		allowed_planets = list(validator.planet_list)
 		# FIX: Wrap planet string in a list so psycopg2 adapts it to SQL ARRAY
 		planet_val = data.get('planet')
 
 		if len(allowed_planets) == 1:
 			# This resource type has only 1 available potential planet, just add it automatically and ignore whatever they tried to add
-			planet_arr = allowed_planets
-		else:
-			# Push whatever planets were assigned from the frontend
-			planet_arr = [planet_val] if planet_val else None
+			return allowed_planets
+		if isinstance(planet_val, list):
+			return planet_val or None
+		# Push whatever planets were assigned from the frontend
+		return [planet_val] if planet_val else None
+
+	def _import_values(self, data, server_id, user_ctx, validator):
+		"""Row tuple in IMPORT_COLS order for an already validated payload."""
+		values = [
+			server_id, validator.class_id, data['name'], self._planet_array(data, validator),
+			data.get('res_weight_rating', 0.0), data.get('notes', ''), user_ctx.get('id') if user_ctx else None
+		]
+		for stat in self.STAT_COLS:
+			val = data.get(stat)
+			values.append(int(val) if val not in (None, "") else None)
+		for rating in RATING_COLS:
+			values.append(data.get(rating))
+		for pct in PCT_COLS:
+			values.append(data.get(pct))
+		return tuple(values)
+
+	def _insert_resource(self, cur, data, server_id, user_ctx, validator):
+		res_class_id = validator.class_id
+		# Get Reporter ID
+		reporter_id = user_ctx.get('id') if user_ctx else None
+		planet_arr = self._planet_array(data, validator)
 
 		cols = ["server_id", "resource_class_id", "name", "planet", "res_weight_rating", "notes", "reporter_id"]
 		vals = [
@@ -396,14 +775,25 @@ class ValidationService(Core):
 			if data.get(f"{stat}_rating") is not None:
 				cols.append(f"{stat}_rating")
 				vals.append(data[f"{stat}_rating"])
+			if data.get(f"{stat}_pct") is not None:
+				cols.append(f"{stat}_pct")
+				vals.append(data[f"{stat}_pct"])
 
+		# Insert-if-absent in one round trip; backed by resource_spawns_server_name_uq
 		placeholders = ",".join(["%s"] * len(vals))
-		sql = f"INSERT INTO resource_spawns ({','.join(cols)}) VALUES ({placeholders})"
+		sql = f"""
+			INSERT INTO resource_spawns ({','.join(cols)}) VALUES ({placeholders})
+			ON CONFLICT (server_id, name) DO NOTHING
+			RETURNING id
+		"""
 		
-		with DatabaseContext.cursor(commit=True) as cur:
-			cur.execute(sql, tuple(vals))
+		cur.execute(sql, tuple(vals))
+		row = cur.fetchone()
+		if row is None:
+			raise DuplicateResource(f"Error: {data['name']} already exists for {server_id}")
+		return row['id']
 
-	def _update_resource(self, data, user_ctx):
+	def _update_resource(self, cur, data, server_id, user_ctx):
 		res_id = data.get('id')
 		reporter_id = user_ctx.get('id') if user_ctx else None
 		
@@ -417,6 +807,9 @@ class ValidationService(Core):
 			if f"{stat}_rating" in data:
 				set_clauses.append(f"{stat}_rating = %s")
 				vals.append(data[f"{stat}_rating"])
+			if f"{stat}_pct" in data:
+				set_clauses.append(f"{stat}_pct = %s")
+				vals.append(data[f"{stat}_pct"])
 
 		for field in ['notes', 'is_active']:
 			if field in data:
@@ -438,25 +831,20 @@ class ValidationService(Core):
 				set_clauses.append("planet = CASE WHEN %s = ANY(COALESCE(planet, ARRAY[]::text[])) THEN array_remove(planet, %s) ELSE array_append(COALESCE(planet, ARRAY[]::text[]), %s) END")
 				vals.extend([planet_val, planet_val, planet_val])
 
-		vals.append(res_id)
-		sql = f"UPDATE resource_spawns SET {', '.join(set_clauses)} WHERE id = %s"
+		# Scoped to the server: only the worker that owns its shard may write a spawn
+		vals.extend([res_id, server_id])
+		sql = f"UPDATE resource_spawns SET {', '.join(set_clauses)} WHERE id = %s AND server_id = %s RETURNING id"
 		
-		with DatabaseContext.cursor(commit=True) as cur:
-			cur.execute(sql, tuple(vals))
+		cur.execute(sql, tuple(vals))
+		if cur.fetchone() is None:
+			raise ValueError("Resource not found")
+		return res_id
 
 	def _check_permission(self, user_ctx, server_id, required_power):
 		if not user_ctx or not user_ctx.get('id'): return False, 'GUEST'
 		uid = user_ctx.get('id')
 		
-		with DatabaseContext.cursor() as cur:
-			cur.execute("SELECT is_superadmin FROM users WHERE discord_id = %s", (uid,))
-			u = cur.fetchone()
-			if u and u['is_superadmin']: return True, 'SUPERADMIN'
-			
-			cur.execute("SELECT role FROM server_permissions WHERE user_id = %s AND server_id = %s", (uid, server_id))
-			p = cur.fetchone()
-			
-		role = p['role'] if p else 'GUEST'
+		role = permission_cache.get_role(uid, server_id)
 		user_power = self.ROLE_HIERARCHY.get(role, 0)
 		
 		return user_power >= required_power, role
@@ -487,6 +875,8 @@ class ValidationService(Core):
 				for server in servers:
 					sid = server['id']
 					cur.execute(sql_grant_perm, (uid, sid, uid))
+				publish_invalidation(cur, uid)
+			permission_cache.invalidate(uid)
 					
 			self.info(f"Synced user {username} ({uid}) and checked permissions for {len(servers)} servers.")
 
@@ -4,17 +4,19 @@ SWGBuddy WebService Module
 Wrapper to run the Flask Frontend as a ServiceManager Process.
 
 """
+import os
 import logging
 from waitress import serve
 from SWGBuddy.core.core import Core
-from SWGBuddy.server import app, start_response_router, current_app
+from SWGBuddy.core.ipc import ShardRouter
+from SWGBuddy.server import app, start_response_router, start_cache_listener, current_app
 
 
 
 class WebService(Core):
-    def __init__(self, validation_queue, log_queue, reply_queue):
+    def __init__(self, validation_queues, log_queue, reply_queue):
         super().__init__(log_queue)
-        self.validation_queue = validation_queue
+        self.validation_queues = validation_queues
         self.reply_queue = reply_queue
 
     def run(self):
@@ -23,12 +25,19 @@ class WebService(Core):
         # 1. Inject Queues into Flask Config
         # Since we are in the same process tree (or forked from it), 
         # we can pass these objects directly.
-        app.config['VAL_QUEUE'] = self.validation_queue
+        # Packets are sharded across the validation worker pool by server_id.
+        # Past SWG_VAL_QUEUE_HWM queued packets per worker, writes are shed with 503.
+        high_water = int(os.getenv("SWG_VAL_QUEUE_HWM", "200"))
+        app.config['VAL_ROUTER'] = ShardRouter(self.validation_queues, high_water=high_water)
+        app.config['RETRY_AFTER'] = int(os.getenv("SWG_RETRY_AFTER", "2"))
         
         # 2. Start the Response Router (Background Thread)
         start_response_router(self.reply_queue)
+
+        # 3. Start the cache invalidation listener (Background Thread)
+        start_cache_listener()
         
-        # 3. Start Waitress
+        # 4. Start Waitress
         # This blocks the process, serving requests indefinitely
         self.info("Starting HTTP Server on 0.0.0.0:5000")
         serve(app, host='0.0.0.0', port=5000, threads=6)
\ No newline at end of file
@@ -32,17 +32,60 @@ const API = {
 		return response;
 	},
 
-	async fetchResources(isDelta = false) {
+	async fetchResources(isDelta = false, category = '') {
 		const serverId = this.getServerContext();
-		if (!isDelta) window.LAST_SYNC_TIMESTAMP = 0;
-		const since = window.LAST_SYNC_TIMESTAMP || 0;
+		// Change sequence: deltas are everything changed after the previous response's next_seq
+		if (!isDelta) window.LAST_SYNC_SEQ = null;
+		const seq = window.LAST_SYNC_SEQ;
+		const since = (seq === null || seq === undefined) ? '' : `&since_seq=${seq}`;
+		// Optional taxonomy subtree, resolved server-side (e.g. 'Metal')
+		const cat = category ? `&category=${encodeURIComponent(category)}` : '';
 
-		const response = await this._fetch(`/api/resource_log?server=${serverId}&since=${since}`);
+		const response = await this._fetch(`/api/resource_log?server=${serverId}${since}${cat}`);
 		const data = await response.json();
-		window.LAST_SYNC_TIMESTAMP = Date.now() / 1000; 
+		window.LAST_SYNC_SEQ = (typeof data.next_seq === 'number') ? data.next_seq : null;
 		return data;
 	},
 
+	/**
+	 * One page of server-side filtered and sorted spawns. params: category, planet, active,
+	 * min_<stat>, sort, dir, limit, after (the previous page's 'next').
+	 */
+	async queryResources(params = {}) {
+		const query = new URLSearchParams({ server: this.getServerContext() });
+		Object.entries(params).forEach(([key, value]) => {
+			if (value !== null && value !== undefined && value !== '') query.set(key, value);
+		});
+		const response = await this._fetch(`/api/resources/query?${query}`);
+		return await response.json();
+	},
+
+	async fetchLeaderboard(category, stat) {
+		const query = new URLSearchParams({ server: this.getServerContext(), category, stat });
+		const response = await this._fetch(`/api/leaderboard?${query}`);
+		return await response.json();
+	},
+
+	/**
+	 * Active spawns ranked by schematic weights, e.g. scoreResources({ oq: 66, sr: 33 }, 'Metal').
+	 */
+	async scoreResources(weights, category = '', limit = 25) {
+		const spec = Object.entries(weights).map(([stat, weight]) => `${stat}:${weight}`).join(',');
+		const query = new URLSearchParams({ server: this.getServerContext(), weights: spec, limit });
+		if (category) query.set('category', category);
+		const response = await this._fetch(`/api/score?${query}`);
+		return await response.json();
+	},
+
+	/**
+	 * Spawn history of a class or category; pass a spawn's stats ({ oq: 950 }) to get percentiles.
+	 */
+	async fetchHistory(category, stats = {}) {
+		const query = new URLSearchParams({ server: this.getServerContext(), category, ...stats });
+		const response = await this._fetch(`/api/history?${query}`);
+		return await response.json();
+	},
+
 	async fetchTaxonomy() {
 		const response = await this._fetch('/api/taxonomy');
 		return await response.json();
@@ -96,6 +139,18 @@ const API = {
 		return result;
 	},
 
+	async importResources(file) {
+		// CSV or JSON; the response carries a per-row accept/reject report
+		const form = new FormData();
+		form.append('file', file);
+		form.append('server_id', this.getServerContext());
+		const response = await this._fetch('/api/import-resources', {
+			method: 'POST',
+			body: form
+		});
+		return await response.json();
+	},
+
 	async fetchManagedUsers(serverId) {
 		const response = await this._fetch(`/api/admin/users?server=${serverId}`);
 		return await response.json();
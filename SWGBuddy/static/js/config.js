@@ -7,8 +7,9 @@ let selectedResourceName = null;      // For row highlighting
 // Data Stores
 let rawResourceData = [];       // Master list from DB
 let filteredData = [];          // List after search/category filters
-let LAST_SYNC_TIMESTAMP = 0;    // For delta updates
+let LAST_SYNC_SEQ = null;     // For delta updates (next_seq from /api/resource_log)
 let pollingTimer = null;
+let resourceStream = null;     // EventSource for /api/stream (polling is the fallback)
 const POLL_INTERVAL = 15000;
 
 // Pagination
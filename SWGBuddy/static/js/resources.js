@@ -23,31 +23,43 @@ function requestUserConfirmation(message) {
 	}
 }
 
+/**
+ * MERGE LOGIC: Update existing, Append new, Drop retired
+ */
+function mergeResourceDelta(newResources, removedIds) {
+	if (newResources.length === 0 && removedIds.length === 0) return;
+
+	console.log(`Delta Sync: Received ${newResources.length} updates, ${removedIds.length} removals.`);
+	if (removedIds.length > 0) {
+		const removed = new Set(removedIds);
+		rawResourceData = rawResourceData.filter(r => !removed.has(r.id));
+	}
+	newResources.forEach(updatedRes => {
+		const idx = rawResourceData.findIndex(r => r.id === updatedRes.id);
+		if (idx !== -1) {
+			// Update existing entry
+			rawResourceData[idx] = updatedRes;
+		} else {
+			// Append new entry
+			rawResourceData.push(updatedRes);
+		}
+	});
+	// Only re-render if we actually changed data
+	if (typeof applyAllTableTransforms === 'function') {
+		applyAllTableTransforms();
+		toggleSort();
+	}
+}
+
 async function loadResources(isDelta = false) {
 	try {
 		const dataPacket = await API.fetchResources(isDelta); 
 		const newResources = dataPacket.resources || [];
+		const removedIds = dataPacket.removed || [];
 		
-		if (isDelta) {
-			// MERGE LOGIC: Update existing, Append new
-			if (newResources.length > 0) {
-				console.log(`Delta Sync: Received ${newResources.length} updates.`);
-				newResources.forEach(updatedRes => {
-					const idx = rawResourceData.findIndex(r => r.id === updatedRes.id);
-					if (idx !== -1) {
-						// Update existing entry
-						rawResourceData[idx] = updatedRes;
-					} else {
-						// Append new entry
-						rawResourceData.push(updatedRes);
-					}
-				});
-				// Only re-render if we actually changed data
-				if (typeof applyAllTableTransforms === 'function') {
-					applyAllTableTransforms();
-					toggleSort();
-				}
-			}
+		// The server answers with a full list when it cannot serve a delta for our since_seq
+		if (isDelta && !dataPacket.full) {
+			mergeResourceDelta(newResources, removedIds);
 		} else {
 			// FULL LOAD: Overwrite
 			rawResourceData = newResources;
@@ -61,6 +73,7 @@ async function loadResources(isDelta = false) {
 
 		// Reset the timer after every successful load (auto or manual)
 		resetPolling();
+		openResourceStream();
 		
 	} catch (error) {
 		console.error("Failed to load resources:", error);
@@ -80,13 +93,44 @@ function resetPolling() {
     
     pollingTimer = setTimeout(() => {
         const tableBody = document.getElementById('resource-log-body');
+        // The push stream delivers changes while it is connected; polling is the fallback
+        if (resourceStream && resourceStream.readyState === EventSource.OPEN) {
+            resetPolling();
         // Check if table is present and visible (offsetParent is null if display: none)
-        if (tableBody && tableBody.offsetParent !== null) {
+        } else if (tableBody && tableBody.offsetParent !== null) {
             loadResources(true);
         }
     }, POLL_INTERVAL);
 }
 
+/**
+ * Opens the server-sent events stream (/api/stream) for the current server, resuming
+ * from LAST_SYNC_SEQ. The browser reconnects on its own and resends the last event id.
+ */
+function openResourceStream() {
+    // Only set when a proxy serves the stream next to the app (SWG_STREAM_URL); otherwise poll
+    const base = window.STREAM_URL;
+    if (!base || !window.EventSource || window.LAST_SYNC_SEQ === null || window.LAST_SYNC_SEQ === undefined) return;
+
+    const serverId = API.getServerContext();
+    if (resourceStream && resourceStream.readyState !== EventSource.CLOSED && resourceStream.serverId === serverId) return;
+    if (resourceStream) resourceStream.close();
+
+    resourceStream = new EventSource(`${base}?server=${serverId}&since_seq=${window.LAST_SYNC_SEQ}`, { withCredentials: true });
+    resourceStream.serverId = serverId;
+
+    resourceStream.addEventListener('changes', (e) => {
+        const data = JSON.parse(e.data);
+        mergeResourceDelta(data.resources || [], data.removed || []);
+        window.LAST_SYNC_SEQ = data.next_seq;
+    });
+    // Our cursor is too old for a delta: reload in full, which reopens the stream
+    resourceStream.addEventListener('resync', () => {
+        resourceStream.close();
+        loadResources(false);
+    });
+}
+
 
 // ------------------------------------------------------------------
 // STATUS & ROW MANAGEMENT
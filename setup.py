@@ -13,9 +13,14 @@ setup(
 		"discord.py",
 		"watchdog",
 		"pytesseract",
-		"Pillow"
+		"Pillow",
+		"numpy"
         # Add other dependencies here if you want pip to handle them
     ],
+	extras_require={
+		# Faster IPC serializer, selected with SWG_IPC_CODEC=msgpack (see core/codec.py)
+		"msgpack": ["msgpack"]
+	},
 	package_data={
 		"SWGBuddy": ["static/*", "templates/*", "assets/*"]
 	}